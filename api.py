@@ -0,0 +1,468 @@
+# uvicorn api:app --host 0.0.0.0 --port 8000 --workers 2
+
+import asyncio
+import io
+import json
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from typing import List, Optional
+from dotenv import load_dotenv
+from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response
+import helper
+import helper_u
+from batch_screen import compare_job_descriptions, screen_resumes
+from corpus import SUPPORTED_EXTENSIONS, extract_resume_text, get_corpus
+from jobs import get_job_queue
+from jd_store import get_jd_store
+from keywords import missing_keywords
+
+# Seconds a request may take end to end before it is answered with 504
+REQUEST_TIMEOUT = float(os.getenv("RESUMEAI_REQUEST_TIMEOUT", "180"))
+# Processes used for PDF/DOCX text extraction
+EXTRACT_WORKERS = int(os.getenv("RESUMEAI_EXTRACT_WORKERS", str(os.cpu_count() or 2)))
+MAX_UPLOAD_BYTES = int(os.getenv("RESUMEAI_MAX_UPLOAD_MB", "10")) * 1024 * 1024
+MAX_BATCH_FILES = int(os.getenv("RESUMEAI_MAX_BATCH_FILES", "200"))
+# Total uncompressed size of the resumes in the zip archives of one request
+MAX_UNZIPPED_BYTES = int(os.getenv("RESUMEAI_MAX_UNZIPPED_MB", "100")) * 1024 * 1024
+MAX_COMPARE_JDS = int(os.getenv("RESUMEAI_MAX_COMPARE_JDS", "20"))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Every endpoint analyzes with the same helper (model and prompt), so scores are comparable across
+# endpoints; helper_u's analysis also has the "Improvements" that tailoring applies
+analyzer = helper_u
+
+MEDIA_TYPES = {
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+}
+
+extract_pool = None
+
+
+@asynccontextmanager
+async def lifespan(app):
+    global extract_pool
+    load_dotenv()
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise RuntimeError("Please set the GEMINI_API_KEY in your .env file")
+    helper.configure_genai(api_key)
+    extract_pool = ProcessPoolExecutor(max_workers=EXTRACT_WORKERS)
+    yield
+    extract_pool.shutdown(cancel_futures=True)
+
+
+app = FastAPI(title="ResumeAI Assistant API", lifespan=lifespan)
+
+
+@app.exception_handler(ValueError)
+async def value_error_handler(request, exc):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+
+@app.exception_handler(Exception)
+async def error_handler(request, exc):
+    return JSONResponse(status_code=500, content={"detail": str(exc)})
+
+
+async def with_timeout(awaitable):
+    """Await within the request timeout, answering 504 when it runs out."""
+    try:
+        return await asyncio.wait_for(awaitable, REQUEST_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"Request did not finish within {REQUEST_TIMEOUT:.0f} seconds")
+
+
+async def read_upload(upload):
+    """Read an upload in chunks, rejecting it as soon as it exceeds MAX_UPLOAD_BYTES."""
+    chunks = []
+    size = 0
+    while True:
+        chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail=f"{upload.filename} is larger than {MAX_UPLOAD_BYTES} bytes")
+        chunks.append(chunk)
+    if not size:
+        raise HTTPException(status_code=400, detail=f"{upload.filename} is empty")
+    return b"".join(chunks)
+
+
+def expand_uploads(uploads, max_files=MAX_BATCH_FILES):
+    """Return (name, bytes) pairs for uploaded (name, bytes) files, expanding zip archives.
+
+    The number of resumes and the uncompressed size of every archive are checked against
+    max_files and MAX_UNZIPPED_BYTES from the archive directory, before any entry is read.
+    """
+    files = []
+    unzipped_bytes = 0
+    for name, data in uploads:
+        if not name.lower().endswith(".zip"):
+            files.append((name, data))
+            continue
+        if not zipfile.is_zipfile(io.BytesIO(data)):
+            raise HTTPException(status_code=400, detail=f"{name} is not a valid zip archive")
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            entries = [
+                info for info in archive.infolist()
+                if not info.is_dir() and info.filename.lower().endswith(SUPPORTED_EXTENSIONS)
+            ]
+            if not entries:
+                raise HTTPException(status_code=400, detail=f"No PDF, DOCX or TXT resumes found in {name}")
+            if len(files) + len(entries) > max_files:
+                raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_FILES} resumes per batch")
+            unzipped_bytes += sum(info.file_size for info in entries)
+            if unzipped_bytes > MAX_UNZIPPED_BYTES:
+                raise HTTPException(
+                    status_code=413, detail=f"Zip archives may expand to at most {MAX_UNZIPPED_BYTES} bytes"
+                )
+            try:
+                # zipfile stops reading an entry at its declared size, so the check above bounds memory
+                files.extend((info.filename, archive.read(info)) for info in entries)
+            except (zipfile.BadZipFile, zipfile.LargeZipFile, NotImplementedError) as e:
+                raise HTTPException(status_code=400, detail=f"Could not read {name}: {e}")
+    if len(files) > max_files:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_FILES} resumes per batch")
+    return files
+
+
+async def extract_text(name, data):
+    """Extract resume text in the process pool."""
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(extract_pool, extract_resume_text, name, data)
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+async def resolve_resume(resume, resume_id):
+    """Return (corpus record, uploaded bytes) for an upload, or (record, None) for a stored resume ID.
+
+    Uploads seen before are recognized by their bytes and not extracted again.
+    """
+    corpus = get_corpus()
+    if resume_id:
+        record = await run_in_threadpool(corpus.get, resume_id)
+        if record is None:
+            raise HTTPException(status_code=404, detail=f"No stored resume with ID {resume_id}")
+        return record, None
+    if resume is None:
+        raise HTTPException(status_code=400, detail="Provide resume or resume_id")
+    data = await read_upload(resume)
+    record = await run_in_threadpool(corpus.find_file, data)
+    if record is None:
+        name = resume.filename or "resume.pdf"
+        text = await extract_text(name, data)
+        record = await run_in_threadpool(corpus.add, name, data, text)
+    return record, data
+
+
+async def resolve_docx(resume, resume_id):
+    """Return (corpus record, DOCX bytes) for a DOCX upload or a stored resume that has a DOCX file."""
+    record, data = await resolve_resume(resume, resume_id)
+    if data is None:
+        stored = await run_in_threadpool(get_corpus().file, record["id"], (".docx",))
+        if stored is None:
+            raise HTTPException(status_code=400, detail=f"Resume {record['id']} has no stored DOCX file")
+        data = stored[1]
+    return record, data
+
+
+async def resolve_job_description(job_description, jd_id):
+    """Return the JD store record for the posted text or saved ID."""
+    if jd_id:
+        record = await run_in_threadpool(get_jd_store().get, jd_id)
+        if record is None:
+            raise HTTPException(status_code=404, detail=f"No saved job description with ID {jd_id}")
+        return record
+    if not job_description or not job_description.strip():
+        raise HTTPException(status_code=400, detail="Provide job_description or jd_id")
+    return await run_in_threadpool(get_jd_store().add, job_description)
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+
+@app.post("/analyze")
+async def analyze(
+    resume: Optional[UploadFile] = File(None),
+    resume_id: Optional[str] = Form(None),
+    job_description: Optional[str] = Form(None),
+    jd_id: Optional[str] = Form(None),
+):
+    """Analyze one resume (PDF, DOCX or TXT upload, or a stored resume ID) against a job description."""
+    async def run():
+        resume_record, _ = await resolve_resume(resume, resume_id)
+        jd_record = await resolve_job_description(job_description, jd_id)
+        resume_text = resume_record["text"]
+        response = await analyzer.analyze_resume_async(resume_text, jd_record["text"], timeout=REQUEST_TIMEOUT)
+        analysis = json.loads(response)
+        # The JD's stored skills spare matching the job description again
+        analysis["MissingKeywords"] = missing_keywords(resume_text, jd_skills=jd_record["skills"])
+        return {"resume_id": resume_record["id"], "jd_id": jd_record["id"], "analysis": analysis}
+
+    return await with_timeout(run())
+
+
+@app.post("/analyze/batch")
+async def analyze_batch(
+    resumes: List[UploadFile] = File([]),
+    resume_ids: List[str] = Form([]),
+    job_description: Optional[str] = Form(None),
+    jd_id: Optional[str] = Form(None),
+    top_n: Optional[int] = Form(None),
+    min_score: Optional[float] = Form(None),
+    concurrency: int = Form(4),
+):
+    """Rank many resumes (uploads, zip archives of resumes or stored resume IDs) against one job description."""
+    async def run():
+        jd_record = await resolve_job_description(job_description, jd_id)
+        files = []
+        for stored_id in resume_ids:
+            stored = await run_in_threadpool(get_corpus().file, stored_id)
+            if stored is None:
+                raise HTTPException(status_code=404, detail=f"No stored resume with ID {stored_id}")
+            files.append(stored)
+        uploads = []
+        for upload in resumes:
+            uploads.append((upload.filename or f"resume_{len(uploads) + 1}", await read_upload(upload)))
+        files.extend(expand_uploads(uploads, max_files=MAX_BATCH_FILES - len(files)))
+        if not files:
+            raise HTTPException(status_code=400, detail="Provide resumes or resume_ids")
+        if len(files) > MAX_BATCH_FILES:
+            raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_FILES} resumes per batch")
+
+        results = await screen_resumes(
+            jd_record["text"],
+            files,
+            concurrency=max(1, min(concurrency, 16)),
+            timeout=REQUEST_TIMEOUT,
+            top_n=top_n,
+            min_score=min_score,
+            extract_pool=extract_pool
+        )
+        return {
+            "jd_id": jd_record["id"],
+            "results": [{"rank": rank, **result} for rank, result in enumerate(results, start=1)],
+        }
+
+    return await with_timeout(run())
+
+
+@app.post("/analyze/multi")
+async def analyze_multi(
+    resume: Optional[UploadFile] = File(None),
+    resume_id: Optional[str] = Form(None),
+    job_descriptions: List[str] = Form([]),
+    jd_ids: List[str] = Form([]),
+    concurrency: int = Form(4),
+):
+    """Compare one resume against several job descriptions (posted texts and/or saved IDs)."""
+    async def run():
+        if not job_descriptions and not jd_ids:
+            raise HTTPException(status_code=400, detail="Provide job_descriptions or jd_ids")
+        if len(job_descriptions) + len(jd_ids) > MAX_COMPARE_JDS:
+            raise HTTPException(status_code=413, detail=f"At most {MAX_COMPARE_JDS} job descriptions per request")
+        # The resume is extracted once (or not at all if stored) and shared by every comparison
+        resume_record, _ = await resolve_resume(resume, resume_id)
+        texts = [text for text in job_descriptions if text.strip()]
+        for saved_id in jd_ids:
+            texts.append((await resolve_job_description(None, saved_id))["text"])
+        results = await compare_job_descriptions(
+            resume_record["text"],
+            texts,
+            concurrency=max(1, min(concurrency, 16)),
+            timeout=REQUEST_TIMEOUT,
+            analyze=analyzer.analyze_resume_async
+        )
+        return {
+            "resume_id": resume_record["id"],
+            "results": [{"rank": rank, **result} for rank, result in enumerate(results, start=1)],
+        }
+
+    return await with_timeout(run())
+
+
+@app.post("/resumes")
+async def store_resumes(resumes: List[UploadFile] = File(...)):
+    """Add resumes (or zip archives of resumes) to the candidate corpus and return their IDs."""
+    async def run():
+        corpus = get_corpus()
+        uploads = []
+        for upload in resumes:
+            uploads.append((upload.filename or f"resume_{len(uploads) + 1}", await read_upload(upload)))
+        files = expand_uploads(uploads)
+
+        # Files seen before are not extracted again; the rest are extracted in the process pool
+        records = [await run_in_threadpool(corpus.find_file, data) for _, data in files]
+        missing = [i for i, record in enumerate(records) if record is None]
+        loop = asyncio.get_running_loop()
+        texts = await asyncio.gather(
+            *(loop.run_in_executor(extract_pool, extract_resume_text, *files[i]) for i in missing),
+            return_exceptions=True
+        )
+        results = [
+            {
+                "file": name,
+                "resume_id": record["id"] if record else None,
+                "already_stored": record is not None,
+                "error": None,
+            }
+            for (name, _), record in zip(files, records)
+        ]
+        for i, text in zip(missing, texts):
+            try:
+                if isinstance(text, Exception):
+                    raise text
+                results[i]["resume_id"] = (await run_in_threadpool(corpus.add, *files[i], text))["id"]
+            except Exception as e:
+                results[i]["error"] = str(e)
+        return {"results": results}
+
+    return await with_timeout(run())
+
+
+@app.get("/resumes/{resume_id}")
+async def get_resume(resume_id: str):
+    record = await run_in_threadpool(get_corpus().get, resume_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"No stored resume with ID {resume_id}")
+    return record
+
+
+@app.post("/resumes/search")
+async def search_resumes(
+    job_description: Optional[str] = Form(None),
+    jd_id: Optional[str] = Form(None),
+    top_n: int = Form(50),
+):
+    """Return the stored resumes most similar to a job description (no model calls)."""
+    jd_record = await resolve_job_description(job_description, jd_id)
+    results = await run_in_threadpool(get_corpus().search, jd_record["text"], max(1, min(top_n, 1000)))
+    return {
+        "jd_id": jd_record["id"],
+        "results": [{"rank": rank, **result} for rank, result in enumerate(results, start=1)],
+    }
+
+
+@app.post("/tailor")
+async def tailor(
+    resume: Optional[UploadFile] = File(None),
+    resume_id: Optional[str] = Form(None),
+    job_description: Optional[str] = Form(None),
+    jd_id: Optional[str] = Form(None),
+    output_format: str = Form("pdf"),
+):
+    """Add the suggested improvements to a DOCX resume (upload or stored ID) and return it as PDF or DOCX."""
+    if output_format not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="output_format must be pdf or docx")
+
+    async def run():
+        resume_record, data = await resolve_docx(resume, resume_id)
+        jd_record = await resolve_job_description(job_description, jd_id)
+        response = await analyzer.analyze_resume_async(
+            resume_record["text"], jd_record["text"], timeout=REQUEST_TIMEOUT
+        )
+        analysis = json.loads(response)
+
+        output = await run_in_threadpool(helper_u.update_word_document, data, analysis.get("Improvements", {}))
+        if output_format == "pdf":
+            output = await run_in_threadpool(helper_u.convert_docx_to_pdf, output)
+        return Response(
+            content=output,
+            media_type=MEDIA_TYPES[output_format],
+            headers={
+                "Content-Disposition": f'attachment; filename="tailored_resume.{output_format}"',
+                "X-Resume-ID": resume_record["id"],
+                "X-JD-ID": jd_record["id"],
+                "X-JD-Match": str(analysis.get("JD Match", "")),
+            }
+        )
+
+    return await with_timeout(run())
+
+
+@app.post("/convert")
+async def convert(document: UploadFile = File(...)):
+    """Convert a DOCX document to PDF."""
+    async def run():
+        data = await read_upload(document)
+        pdf_bytes = await run_in_threadpool(helper_u.convert_docx_to_pdf, data)
+        return Response(
+            content=pdf_bytes,
+            media_type=MEDIA_TYPES["pdf"],
+            headers={"Content-Disposition": 'attachment; filename="converted.pdf"'}
+        )
+
+    return await with_timeout(run())
+
+
+@app.post("/jobs/analyze", status_code=202)
+async def submit_analysis_job(
+    resume: Optional[UploadFile] = File(None),
+    resume_id: Optional[str] = Form(None),
+    job_description: Optional[str] = Form(None),
+    jd_id: Optional[str] = Form(None),
+):
+    """Queue an analysis for the background workers; poll GET /jobs/{id} for the result."""
+    resume_record, _ = await resolve_resume(resume, resume_id)
+    jd_record = await resolve_job_description(job_description, jd_id)
+    # Workers analyze with helper_u when improvements are requested, matching `analyzer`
+    payload = {"resume_text": resume_record["text"], "job_description": jd_record["text"], "improvements": True}
+    job_id = await run_in_threadpool(get_job_queue().submit, "analyze", payload)
+    return await job_status(job_id)
+
+
+@app.post("/jobs/tailor", status_code=202)
+async def submit_tailor_job(
+    resume: Optional[UploadFile] = File(None),
+    resume_id: Optional[str] = Form(None),
+    job_description: Optional[str] = Form(None),
+    jd_id: Optional[str] = Form(None),
+    output_format: str = Form("pdf"),
+):
+    """Queue tailoring of a DOCX resume; fetch the file from GET /jobs/{id}/output when done."""
+    if output_format not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="output_format must be pdf or docx")
+    _, data = await resolve_docx(resume, resume_id)
+    jd_record = await resolve_job_description(job_description, jd_id)
+    payload = {"job_description": jd_record["text"], "output_format": output_format}
+    job_id = await run_in_threadpool(get_job_queue().submit, "tailor", payload, data)
+    return await job_status(job_id)
+
+
+@app.post("/jobs/convert", status_code=202)
+async def submit_convert_job(document: UploadFile = File(...)):
+    """Queue a DOCX to PDF conversion; fetch the PDF from GET /jobs/{id}/output when done."""
+    data = await read_upload(document)
+    job_id = await run_in_threadpool(get_job_queue().submit, "convert", {}, data)
+    return await job_status(job_id)
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = await run_in_threadpool(get_job_queue().get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No job with ID {job_id}")
+    return job
+
+
+@app.get("/jobs/{job_id}/output")
+async def job_output(job_id: str):
+    output = await run_in_threadpool(get_job_queue().output, job_id)
+    if output is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} has no output (yet)")
+    output_format = "pdf" if output.startswith(b"%PDF") else "docx"
+    return Response(
+        content=output,
+        media_type=MEDIA_TYPES[output_format],
+        headers={"Content-Disposition": f'attachment; filename="{job_id}.{output_format}"'}
+    )
@@ -4,53 +4,140 @@ import streamlit as st
 from streamlit_extras.add_vertical_space import add_vertical_space
 import os
 import json
+import hashlib
 from dotenv import load_dotenv
-from helper import configure_genai, get_gemini_response, extract_pdf_text, prepare_prompt
+from batch_screen import compare_job_descriptions_sync
+from corpus import get_corpus
+import helper
+from helper import configure_genai, analyze_resume, analyze_resume_stream, validate_response, response_cache
+from incremental import can_reanalyze, make_base, reanalyze
+from jd_store import get_jd_store, make_jd_id
+from jobs import get_job_queue
+from keywords import missing_keywords
+from gemini_client import get_scheduler
+from prompt_budget import budget_stats
+from response_parser import IncrementalJSONParser
 
 def init_session_state():
     """Initialize session state variables."""
     if 'processing' not in st.session_state:
         st.session_state.processing = False
+    if 'analysis_result' not in st.session_state:
+        st.session_state.analysis_result = None
+    if 'analysis_key' not in st.session_state:
+        st.session_state.analysis_key = None
+    if 'analysis_base' not in st.session_state:
+        st.session_state.analysis_base = None
+    if 'comparison_result' not in st.session_state:
+        st.session_state.comparison_result = None
+    if 'comparison_key' not in st.session_state:
+        st.session_state.comparison_key = None
 
 
-def main():
-    # Load environment variables
-    load_dotenv()
-    
-    # Initialize session state
-    init_session_state()
-    
-    # Configure Generative AI
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        st.error("Please set the GEMINI_API_KEY in your .env file")
-        return
+# Seconds to wait for a background worker before analyzing in this process instead
+JOB_WAIT_SECONDS = float(os.getenv("RESUMEAI_JOB_WAIT_SECONDS", "120"))
+
+# Response fields in the order they are displayed
+RESULT_FIELDS = ["JD Match", "MissingKeywords", "Profile Summary", "Improvements", "Cold Message"]
+
+
+def render_field(placeholder, field, value):
+    """Render one response field into its placeholder."""
+    with placeholder.container():
+        if field == "JD Match":
+            # Match percentage
+            st.metric("Match Score", value if value is not None else "N/A")
+            
+        elif field == "MissingKeywords":
+            # Missing keywords
+            st.subheader("Missing Keywords")
+            if value:
+                st.write(", ".join(value))
+            else:
+                st.write("No critical missing keywords found!")
+                
+        elif field == "Profile Summary":
+            # Profile summary
+            st.subheader("Profile Summary")
+            st.write(value or "No summary available")
+            
+        elif field == "Improvements":
+            # Suggested improvements
+            st.subheader("Suggested Improvements")
+            if value:
+                experience_improvements = value.get("Experience", [])
+                if experience_improvements:
+                    st.write("**Experience:**")
+                    for item in experience_improvements:
+                        st.write(f"- {item}")
+                
+                skills_improvements = value.get("Skills", [])
+                if skills_improvements:
+                    st.write("**Skills:**")
+                    for item in skills_improvements:
+                        st.write(f"- {item}")
+            else:
+                st.write("No specific improvements suggested.")
+                
+        elif field == "Cold Message":
+            # Cold message
+            st.subheader("Cold Message")
+            st.write(value or "No message available")
+
+
+def select_saved_jd():
+    """Let the user pick a saved job description; a `?jd=<id>` query parameter preselects one."""
+    jd_store = get_jd_store()
+    options = {"": "New job description"}
+    for jd_id, title in jd_store.list():
+        options[jd_id] = f"{title} ({jd_id})"
         
-    try:
-        configure_genai(api_key)
-    except Exception as e:
-        st.error(f"Failed to configure API: {str(e)}")
-        return
+    requested_id = st.query_params.get("jd", "")
+    if requested_id and requested_id not in options and jd_store.get(requested_id):
+        options[requested_id] = f"{jd_store.get(requested_id)['title']} ({requested_id})"
+        
+    ids = list(options)
+    selected_id = st.selectbox(
+        "Saved Job Descriptions",
+        options=ids,
+        index=ids.index(requested_id) if requested_id in options else 0,
+        format_func=options.get
+    )
+    return jd_store.get(selected_id) if selected_id else None
 
-    # Sidebar
-    with st.sidebar:
-        st.title("Smart Analyzer 🎯")
-        st.subheader("About")
-        st.write("""
-        Smart Resume Analyzer:
-        - Evaluate resume-job description match.
-        - Identify missing keywords.
-        - Get personalized improvement suggestions.
-        - Generate the cold message.
-        """)
 
-    # Main content
-    st.title("📄 Smart Resume Analyzer")
-    st.subheader("Optimize Your Resume")
-    
+@st.cache_resource(show_spinner=False)
+def configure_model(api_key):
+    """Configure the Generative AI API once per server process."""
+    configure_genai(api_key)
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def cached_resume(file_hash, _data, name):
+    """Store an upload in the candidate corpus once per distinct file and return its record.
+
+    The corpus recognizes files (and resume texts) it has seen before, so those are not extracted again.
+    """
+    return get_corpus().ingest(name, _data)
+
+
+def select_saved_resume(key):
+    """Let the user pick a resume stored in the candidate corpus instead of uploading one."""
+    corpus = get_corpus()
+    options = {"": "Upload a resume above"}
+    for resume_id, name in corpus.list():
+        options[resume_id] = f"{name} ({resume_id})"
+    selected_id = st.selectbox("Saved Resumes", options=list(options), format_func=options.get, key=key)
+    return corpus.get(selected_id) if selected_id else None
+
+
+def render_analysis():
+    """Analyze one resume against one job description."""
     # Input sections with validation
+    saved_jd = select_saved_jd()
     jd = st.text_area(
         "Job Description",
+        value=saved_jd["text"] if saved_jd else "",
         placeholder="Paste the job description here...",
         help="Enter the complete job description for accurate analysis"
     )
@@ -60,14 +147,22 @@ def main():
         type="pdf",
         help="Upload your resume in PDF format"
     )
+    saved_resume = None if uploaded_file else select_saved_resume("saved_resume")
 
+    # Inputs are identified by content hash (or stored resume ID) so reruns can reuse earlier work
+    resume_bytes = uploaded_file.getvalue() if uploaded_file else None
+    resume_hash = hashlib.sha256(resume_bytes).hexdigest() if resume_bytes else None
+    resume_key = resume_hash or (saved_resume["id"] if saved_resume else None)
+    current_key = (resume_key, make_jd_id(jd)) if resume_key and jd else None
+    analyzed_now = False
+    
     # Process button with loading state
     if st.button("Analyze Resume", disabled=st.session_state.processing):
         if not jd:
             st.warning("Please provide a job description.")
             return
             
-        if not uploaded_file:
+        if not resume_key:
             st.warning("Please upload a resume in PDF format.")
             return
             
@@ -75,68 +170,247 @@ def main():
         
         try:
             with st.spinner("📊 Analyzing your resume..."):
-                # Extract text from PDF
-                resume_text = extract_pdf_text(uploaded_file)
+                # Extract text from PDF (only for files the corpus has not seen)
+                resume_record = saved_resume or cached_resume(resume_hash, resume_bytes, uploaded_file.name)
+                resume_text = resume_record["text"]
+                st.caption(f"Resume ID: {resume_record['id']}")
                 
-                # Prepare prompt
-                input_prompt = prepare_prompt(resume_text, jd)
+                # Store the JD (or reuse its precomputed record) so it can be selected by ID later
+                jd_record = get_jd_store().add(jd)
+                st.caption(f"Job description ID: {jd_record['id']}")
                 
-                # Get and parse response
-                response = get_gemini_response(input_prompt)
-                # st.write(response)  # Log the response content
+                # Reserve a slot per field so each one renders as soon as it streams in
+                status = st.empty()
+                placeholders = {field: st.empty() for field in RESULT_FIELDS}
                 
-                # Remove control characters from the response
-                response = response.replace("\n", " ").replace("\r", "").replace("\t", " ")
-                response_json = json.loads(response)
+                response_json = None
+                if st.session_state.analysis_key == current_key and st.session_state.analysis_result:
+                    # Same resume and JD as the stored analysis, so there is nothing to recompute
+                    response_json = st.session_state.analysis_result
+                elif can_reanalyze(st.session_state.analysis_base, resume_text, jd):
+                    # A small edit of the last fully analyzed resume: only changed sections go to the model
+                    status.info("🔁 Re-analyzing the changed resume sections...")
+                    try:
+                        response_json, stats = reanalyze(st.session_state.analysis_base, resume_text, jd, helper)
+                    except Exception as e:
+                        # A failed section call is not worth an error; the full analysis below covers it
+                        status.info(f"🔁 Re-analysis failed ({e}), running a full analysis instead...")
+                    else:
+                        st.caption(
+                            f"Re-analyzed {len(stats['changed_sections'])} changed sections, "
+                            f"reused {stats['reused_sections']} unchanged ones"
+                        )
+                        st.session_state.analysis_result = response_json
+                        st.session_state.analysis_key = current_key
+                if response_json is None:
+                    # Missing keywords come from the local keyword engine, so show them right away
+                    local_missing = missing_keywords(resume_text, jd_skills=jd_record["skills"])
+                    render_field(placeholders["MissingKeywords"], "MissingKeywords", local_missing)
                 
-                # Display results
-                st.success("✨ Analysis Complete!")
-                
-                # Match percentage
-                match_percentage = response_json.get("JD Match", "N/A")
-                st.metric("Match Score", match_percentage)
-                
-                # Missing keywords
-                st.subheader("Missing Keywords")
-                missing_keywords = response_json.get("MissingKeywords", [])
-                if missing_keywords:
-                    st.write(", ".join(missing_keywords))
-                else:
-                    st.write("No critical missing keywords found!")
-                
-                # Profile summary
-                st.subheader("Profile Summary")
-                st.write(response_json.get("Profile Summary", "No summary available"))
-                
-                # Suggested improvements
-                st.subheader("Suggested Improvements")
-                improvements = response_json.get("Improvements", {})
-                
-                if improvements:
-                    experience_improvements = improvements.get("Experience", [])
-                    if experience_improvements:
-                        st.write("**Experience:**")
-                        for item in experience_improvements:
-                            st.write(f"- {item}")
+                    job_queue = get_job_queue()
+                    if job_queue.workers_alive():
+                        # Hand the model call to the background workers; an identical request (e.g. after
+                        # a reconnect) attaches to the same job instead of starting another one
+                        job_id = job_queue.submit("analyze", {
+                            "resume_text": resume_text,
+                            "job_description": jd_record["text"],
+                            "improvements": False,
+                        })
+                        job = job_queue.wait(job_id, timeout=JOB_WAIT_SECONDS, on_status=lambda j: status.info(
+                            f"⏳ Analysis {j['status']} (attempt {max(j['attempts'], 1)} of {j['max_attempts']})"
+                        ))
+                        if job is None or job["status"] == "cancelled":
+                            # The workers may have stopped after the job was submitted; withdraw the job
+                            # so it is not also sent to the model when a worker gets to it
+                            job_queue.cancel(job_id)
+                            status.info("⏳ Background workers are not responding, analyzing here instead...")
+                        elif job["status"] == "failed":
+                            raise Exception(job["error"])
+                        else:
+                            response_json = job["result"]
+                    if response_json is None:
+                        # Stream the response (served from cache for repeat resume/JD pairs)
+                        parser = IncrementalJSONParser()
+                        chunks = []
+                        for chunk in analyze_resume_stream(resume_text, jd_record["text"]):
+                            chunks.append(chunk)
+                            for field, value in parser.feed(chunk):
+                                if field in placeholders and field != "MissingKeywords":
+                                    render_field(placeholders[field], field, value)
                     
-                    skills_improvements = improvements.get("Skills", [])
-                    if skills_improvements:
-                        st.write("**Skills:**")
-                        for item in skills_improvements:
-                            st.write(f"- {item}")
-                else:
-                    st.write("No specific improvements suggested.")
+                        # Parse the complete response, repairing near-valid JSON
+                        response_json = json.loads(validate_response("".join(chunks)))
+                    response_json["MissingKeywords"] = local_missing
                 
-                # Cold message
-                st.subheader("Cold Message")
-                st.write(response_json.get("Cold Message", "No message available"))
+                    st.session_state.analysis_result = response_json
+                    st.session_state.analysis_key = current_key
+                    # Later edits of this resume are compared against this full analysis section by section
+                    st.session_state.analysis_base = make_base(resume_text, jd, response_json)
                 
+                # Display final results
+                status.success("✨ Analysis Complete!")
+                for field in RESULT_FIELDS:
+                    render_field(placeholders[field], field, response_json.get(field))
+                analyzed_now = True
                 
         except Exception as e:
             st.error(f"An error occurred: {str(e)}")
             
         finally:
             st.session_state.processing = False
+    
+    # On other reruns show the stored analysis instead of recomputing it
+    result = st.session_state.analysis_result
+    if result and not analyzed_now and st.session_state.analysis_key == current_key:
+        for field in RESULT_FIELDS:
+            render_field(st.empty(), field, result.get(field))
+
+
+def split_job_descriptions(text):
+    """Split pasted text into job descriptions separated by lines of '---'."""
+    job_descriptions, current = [], []
+    for line in text.splitlines():
+        if line.strip() == "---":
+            job_descriptions.append("\n".join(current))
+            current = []
+        else:
+            current.append(line)
+    job_descriptions.append("\n".join(current))
+    return [jd for jd in job_descriptions if jd.strip()]
+
+
+def render_comparison_table(results):
+    """Render comparison results as a table plus one expandable summary per JD."""
+    st.dataframe(
+        [
+            {
+                "Job Description": result["title"],
+                "JD ID": result["jd_id"],
+                "JD Match": result["score"],
+                "Missing Keywords": ", ".join(result["missing_keywords"] or []),
+                "Error": result["error"] or "",
+            }
+            for result in results
+        ],
+        hide_index=True
+    )
+    for result in results:
+        if result["analysis"]:
+            with st.expander(f"{result['title']} ({result['jd_id']})"):
+                st.write(result["analysis"].get("Profile Summary") or "No summary available")
+
+
+def render_comparison():
+    """Analyze one resume against several job descriptions at once."""
+    jd_store = get_jd_store()
+    saved_options = {jd_id: f"{title} ({jd_id})" for jd_id, title in jd_store.list()}
+    saved_ids = st.multiselect(
+        "Saved Job Descriptions",
+        options=list(saved_options),
+        format_func=saved_options.get,
+        key="compare_saved_jds"
+    )
+    pasted = st.text_area(
+        "Job Descriptions",
+        placeholder="Paste one or more job descriptions, separated by a line containing only ---",
+        key="compare_jds"
+    )
+    uploaded_file = st.file_uploader(
+        "Resume (PDF)",
+        type="pdf",
+        help="Upload your resume in PDF format",
+        key="compare_resume"
+    )
+    saved_resume = None if uploaded_file else select_saved_resume("compare_saved_resume")
+
+    saved_records = [record for record in map(jd_store.get, saved_ids) if record]
+    job_descriptions = [record["text"] for record in saved_records] + split_job_descriptions(pasted)
+    resume_bytes = uploaded_file.getvalue() if uploaded_file else None
+    resume_hash = hashlib.sha256(resume_bytes).hexdigest() if resume_bytes else None
+    resume_key = resume_hash or (saved_resume["id"] if saved_resume else None)
+    current_key = (resume_key, tuple(make_jd_id(jd) for jd in job_descriptions)) if resume_key else None
+
+    if st.button("Compare", disabled=st.session_state.processing):
+        if not job_descriptions:
+            st.warning("Please provide at least one job description.")
+            return
+
+        if not resume_key:
+            st.warning("Please upload a resume in PDF format.")
+            return
+
+        if st.session_state.comparison_key != current_key:
+            st.session_state.processing = True
+            try:
+                with st.spinner(f"📊 Comparing your resume with {len(job_descriptions)} job descriptions..."):
+                    # Extract the resume once; the model calls for all JDs run concurrently in threads
+                    resume_record = saved_resume or cached_resume(resume_hash, resume_bytes, uploaded_file.name)
+                    st.session_state.comparison_result = compare_job_descriptions_sync(
+                        resume_record["text"], job_descriptions, analyze_resume
+                    )
+                    st.session_state.comparison_key = current_key
+
+            except Exception as e:
+                st.error(f"An error occurred: {str(e)}")
+
+            finally:
+                st.session_state.processing = False
+
+    if st.session_state.comparison_result and st.session_state.comparison_key == current_key:
+        render_comparison_table(st.session_state.comparison_result)
+
+
+def main():
+    # Load environment variables
+    load_dotenv()
+    
+    # Initialize session state
+    init_session_state()
+    
+    # Configure Generative AI
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        st.error("Please set the GEMINI_API_KEY in your .env file")
+        return
+        
+    try:
+        configure_model(api_key)
+    except Exception as e:
+        st.error(f"Failed to configure API: {str(e)}")
+        return
+
+    # Sidebar
+    with st.sidebar:
+        st.title("Smart Analyzer 🎯")
+        st.subheader("About")
+        st.write("""
+        Smart Resume Analyzer:
+        - Evaluate resume-job description match.
+        - Identify missing keywords.
+        - Get personalized improvement suggestions.
+        - Generate the cold message.
+        - Compare one resume against several job descriptions.
+        """)
+        cache_stats = response_cache.stats()
+        st.caption(f"Cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses")
+        if budget_stats.prompts:
+            st.caption(f"Prompt compaction saved ~{budget_stats.tokens_saved} tokens")
+        model_stats = get_scheduler().stats()
+        if model_stats["calls"]:
+            st.caption(
+                f"Model calls: {model_stats['calls']} "
+                f"({model_stats['retries']} retried, {model_stats['coalesced']} shared)"
+            )
+
+    # Main content
+    st.title("📄 Smart Resume Analyzer")
+    st.subheader("Optimize Your Resume")
+    
+    analyze_tab, compare_tab = st.tabs(["Analyze", "Compare Job Descriptions"])
+    with analyze_tab:
+        render_analysis()
+    with compare_tab:
+        render_comparison()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -4,17 +4,25 @@ import streamlit as st
 from streamlit_extras.add_vertical_space import add_vertical_space
 import os
 import json
-import io
+import hashlib
 from dotenv import load_dotenv
+import helper_u
 from helper_u import (
     configure_genai, 
-    get_gemini_response, 
-    extract_pdf_text, 
-    extract_docx_text, 
-    prepare_prompt,
+    analyze_resume_stream, 
     update_word_document,
-    convert_docx_to_pdf
+    convert_docx_to_pdf,
+    validate_response,
+    response_cache
 )
+from converters import active_converter
+from corpus import get_corpus
+from incremental import can_reanalyze, make_base, reanalyze
+from jd_store import get_jd_store, make_jd_id
+from keywords import missing_keywords
+from gemini_client import get_scheduler
+from prompt_budget import budget_stats
+from response_parser import IncrementalJSONParser
 
 def init_session_state():
     """Initialize session state variables."""
@@ -26,6 +34,142 @@ def init_session_state():
         st.session_state.updated_docx = None
     if 'analysis_result' not in st.session_state:
         st.session_state.analysis_result = None
+    if 'analysis_key' not in st.session_state:
+        st.session_state.analysis_key = None
+    if 'analysis_base' not in st.session_state:
+        st.session_state.analysis_base = None
+
+
+# Response fields in the order they are displayed
+RESULT_FIELDS = ["JD Match", "MissingKeywords", "Profile Summary", "Improvements", "Cold Message"]
+
+
+def render_field(placeholder, field, value):
+    """Render one response field into its placeholder."""
+    with placeholder.container():
+        if field == "JD Match":
+            # Match percentage
+            st.metric("Match Score", value if value is not None else "N/A")
+            
+        elif field == "MissingKeywords":
+            # Missing keywords
+            st.subheader("Missing Keywords")
+            if value:
+                st.write(", ".join(value))
+            else:
+                st.write("No critical missing keywords found!")
+                
+        elif field == "Profile Summary":
+            # Profile summary
+            st.subheader("Profile Summary")
+            st.write(value or "No summary available")
+            
+        elif field == "Improvements":
+            # Suggested improvements
+            st.subheader("Suggested Improvements")
+            if value:
+                experience_improvements = value.get("Experience", [])
+                if experience_improvements:
+                    st.write("**Experience:**")
+                    for item in experience_improvements:
+                        st.write(f"- {item}")
+                
+                skills_improvements = value.get("Skills", [])
+                if skills_improvements:
+                    st.write("**Skills:**")
+                    for item in skills_improvements:
+                        st.write(f"- {item}")
+                
+                projects_improvements = value.get("Projects", [])
+                if projects_improvements:
+                    st.write("**Projects:**")
+                    for item in projects_improvements:
+                        st.write(f"- {item}")
+            else:
+                st.write("No specific improvements suggested.")
+                
+        elif field == "Cold Message":
+            # Cold message
+            st.subheader("Cold Message")
+            st.write(value or "No message available")
+
+
+def select_saved_jd():
+    """Let the user pick a saved job description; a `?jd=<id>` query parameter preselects one."""
+    jd_store = get_jd_store()
+    options = {"": "New job description"}
+    for jd_id, title in jd_store.list():
+        options[jd_id] = f"{title} ({jd_id})"
+        
+    requested_id = st.query_params.get("jd", "")
+    if requested_id and requested_id not in options and jd_store.get(requested_id):
+        options[requested_id] = f"{jd_store.get(requested_id)['title']} ({requested_id})"
+        
+    ids = list(options)
+    selected_id = st.selectbox(
+        "Saved Job Descriptions",
+        options=ids,
+        index=ids.index(requested_id) if requested_id in options else 0,
+        format_func=options.get
+    )
+    return jd_store.get(selected_id) if selected_id else None
+
+
+@st.cache_resource(show_spinner=False)
+def configure_model(api_key):
+    """Configure the Generative AI API once per server process."""
+    configure_genai(api_key)
+
+
+# Upload bytes are passed with a leading underscore so Streamlit keys on the hash instead of rehashing them
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def cached_resume_text(file_hash, _data, name):
+    """Extract resume text once per distinct upload, via the candidate corpus (which skips files it has seen)."""
+    return get_corpus().ingest(name, _data)["text"]
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def cached_updated_document(file_hash, _docx_content, improvements_json):
+    """Apply improvements to a resume once per distinct resume and improvement set."""
+    return update_word_document(_docx_content, json.loads(improvements_json))
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def cached_pdf(docx_hash, _docx_bytes):
+    """Convert a generated resume to PDF once per distinct document."""
+    return convert_docx_to_pdf(_docx_bytes)
+
+
+def render_tailoring(docx_content, docx_hash, improvements):
+    """Offer the improved resume for download, built from the stored analysis."""
+    if not st.checkbox("Apply suggested improvements to my resume", key="apply_changes"):
+        return
+        
+    with st.spinner("Updating your resume..."):
+        improvements_json = json.dumps(improvements or {}, sort_keys=True)
+        updated_docx_bytes = cached_updated_document(docx_hash, docx_content, improvements_json)
+        st.session_state.updated_docx = updated_docx_bytes
+        
+        # Convert to PDF
+        pdf_bytes = cached_pdf(hashlib.sha256(updated_docx_bytes).hexdigest(), updated_docx_bytes)
+        
+    # Provide download buttons
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button(
+            "Download Updated Resume (DOCX)",
+            data=updated_docx_bytes,
+            file_name="updated_resume.docx",
+            mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+        )
+    with col2:
+        st.download_button(
+            "Download Updated Resume (PDF)",
+            data=pdf_bytes,
+            file_name="updated_resume.pdf",
+            mime="application/pdf"
+        )
 
 
 def main():
@@ -42,7 +186,7 @@ def main():
         return
         
     try:
-        configure_genai(api_key)
+        configure_model(api_key)
     except Exception as e:
         st.error(f"Failed to configure API: {str(e)}")
         return
@@ -60,14 +204,32 @@ def main():
         - Update your resume with suggested improvements
         - Download the updated resume as a PDF
         """)
+        cache_stats = response_cache.stats()
+        st.caption(f"Cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses")
+        if budget_stats.prompts:
+            st.caption(f"Prompt compaction saved ~{budget_stats.tokens_saved} tokens")
+        model_stats = get_scheduler().stats()
+        if model_stats["calls"]:
+            st.caption(
+                f"Model calls: {model_stats['calls']} "
+                f"({model_stats['retries']} retried, {model_stats['coalesced']} shared)"
+            )
+        converter = active_converter()
+        if converter and converter.stats.conversions:
+            st.caption(
+                f"PDF conversions: {converter.stats.conversions} with {converter.name}, "
+                f"{converter.stats.average_seconds:.2f}s average"
+            )
 
     # Main content
     st.title("📄 Smart Resume Analyzer")
     st.subheader("Optimize Your Resume")
     
     # Input sections with validation
+    saved_jd = select_saved_jd()
     jd = st.text_area(
         "Job Description",
+        value=saved_jd["text"] if saved_jd else "",
         placeholder="Paste the job description here...",
         help="Enter the complete job description for accurate analysis"
     )
@@ -95,6 +257,13 @@ def main():
         if uploaded_file:
             st.success("PDF document uploaded successfully!")
 
+    # Inputs are identified by content hash so reruns can reuse earlier work
+    resume_bytes = uploaded_file.getvalue() if uploaded_file else None
+    resume_hash = hashlib.sha256(resume_bytes).hexdigest() if resume_bytes else None
+    is_docx = file_type == "Word Document (.docx)"
+    current_key = (resume_hash, make_jd_id(jd)) if resume_hash and jd else None
+    analyzed_now = False
+    
     # Process button with loading state
     if st.button("Analyze Resume", disabled=st.session_state.processing):
         if not jd:
@@ -109,111 +278,82 @@ def main():
         
         try:
             with st.spinner("📊 Analyzing your resume..."):
-                # Extract text from file
-                if file_type == "Word Document (.docx)":
-                    docx_content = uploaded_file.read()
-                    st.session_state.docx_content = docx_content
-                    resume_text = extract_docx_text(io.BytesIO(docx_content))
-                else:
-                    resume_text = extract_pdf_text(uploaded_file)
-                
-                # Prepare prompt
-                input_prompt = prepare_prompt(resume_text, jd)
+                # Extract text from file (memoized per upload)
+                resume_text = cached_resume_text(resume_hash, resume_bytes, uploaded_file.name)
+                st.session_state.docx_content = resume_bytes if is_docx else None
                 
-                # Get and parse response
-                response = get_gemini_response(input_prompt)
+                # Store the JD (or reuse its precomputed record) so it can be selected by ID later
+                jd_record = get_jd_store().add(jd)
+                st.caption(f"Job description ID: {jd_record['id']}")
                 
-                # Remove control characters from the response
-                response = response.replace("\n", " ").replace("\r", "").replace("\t", " ")
-                response_json = json.loads(response)
-                st.session_state.analysis_result = response_json
+                # Reserve a slot per field so each one renders as soon as it streams in
+                status = st.empty()
+                placeholders = {field: st.empty() for field in RESULT_FIELDS}
                 
-                # Display results
-                st.success("✨ Analysis Complete!")
-                
-                # Match percentage
-                match_percentage = response_json.get("JD Match", "N/A")
-                st.metric("Match Score", match_percentage)
-                
-                # Missing keywords
-                st.subheader("Missing Keywords")
-                missing_keywords = response_json.get("MissingKeywords", [])
-                if missing_keywords:
-                    st.write(", ".join(missing_keywords))
-                else:
-                    st.write("No critical missing keywords found!")
-                
-                # Profile summary
-                st.subheader("Profile Summary")
-                st.write(response_json.get("Profile Summary", "No summary available"))
-                
-                # Suggested improvements
-                st.subheader("Suggested Improvements")
-                
-                improvements = response_json.get("Improvements", {})
-                
-                if improvements:
-                    experience_improvements = improvements.get("Experience", [])
-                    if experience_improvements:
-                        st.write("**Experience:**")
-                        for item in experience_improvements:
-                            st.write(f"- {item}")
+                response_json = None
+                if st.session_state.analysis_key == current_key and st.session_state.analysis_result:
+                    # Same resume and JD as the stored analysis, so there is nothing to recompute
+                    response_json = st.session_state.analysis_result
+                elif can_reanalyze(st.session_state.analysis_base, resume_text, jd):
+                    # A small edit of the last fully analyzed resume: only changed sections go to the model
+                    status.info("🔁 Re-analyzing the changed resume sections...")
+                    try:
+                        response_json, stats = reanalyze(st.session_state.analysis_base, resume_text, jd, helper_u)
+                    except Exception as e:
+                        # A failed section call is not worth an error; the full analysis below covers it
+                        status.info(f"🔁 Re-analysis failed ({e}), running a full analysis instead...")
+                    else:
+                        st.caption(
+                            f"Re-analyzed {len(stats['changed_sections'])} changed sections, "
+                            f"reused {stats['reused_sections']} unchanged ones"
+                        )
+                        st.session_state.analysis_result = response_json
+                        st.session_state.analysis_key = current_key
+                if response_json is None:
+                    # Missing keywords come from the local keyword engine, so show them right away
+                    local_missing = missing_keywords(resume_text, jd_skills=jd_record["skills"])
+                    render_field(placeholders["MissingKeywords"], "MissingKeywords", local_missing)
                     
-                    skills_improvements = improvements.get("Skills", [])
-                    if skills_improvements:
-                        st.write("**Skills:**")
-                        for item in skills_improvements:
-                            st.write(f"- {item}")
+                    # Stream the response (served from cache for repeat resume/JD pairs)
+                    parser = IncrementalJSONParser()
+                    chunks = []
+                    for chunk in analyze_resume_stream(resume_text, jd_record["text"]):
+                        chunks.append(chunk)
+                        for field, value in parser.feed(chunk):
+                            if field in placeholders and field != "MissingKeywords":
+                                render_field(placeholders[field], field, value)
                     
-                    projects_improvements = improvements.get("Projects", [])
-                    if projects_improvements:
-                        st.write("**Projects:**")
-                        for item in projects_improvements:
-                            st.write(f"- {item}")
-                else:
-                    st.write("No specific improvements suggested.")
+                    # Parse the complete response, repairing near-valid JSON
+                    response_json = json.loads(validate_response("".join(chunks)))
+                    response_json["MissingKeywords"] = local_missing
+                    st.session_state.analysis_result = response_json
+                    st.session_state.analysis_key = current_key
+                    # Later edits of this resume are compared against this full analysis section by section
+                    st.session_state.analysis_base = make_base(resume_text, jd, response_json)
                 
-                # Cold message
-                st.subheader("Cold Message")
-                st.write(response_json.get("Cold Message", "No message available"))
-                
-                # Update Word document (if applicable)
-                if file_type == "Word Document (.docx)" and st.session_state.docx_content:
-                    apply_changes = st.checkbox("Apply suggested improvements to my resume")
-                    
-                    if apply_changes:
-                        with st.spinner("Updating your resume..."):
-                            updated_docx_bytes = update_word_document(
-                                io.BytesIO(st.session_state.docx_content),
-                                response_json.get("Improvements", {})
-                            )
-                            st.session_state.updated_docx = updated_docx_bytes
-                            
-                            # Convert to PDF
-                            pdf_bytes = convert_docx_to_pdf(io.BytesIO(updated_docx_bytes))
-                            
-                            # Provide download buttons
-                            col1, col2 = st.columns(2)
-                            with col1:
-                                st.download_button(
-                                    "Download Updated Resume (DOCX)",
-                                    data=updated_docx_bytes,
-                                    file_name="updated_resume.docx",
-                                    mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                                )
-                            with col2:
-                                st.download_button(
-                                    "Download Updated Resume (PDF)",
-                                    data=pdf_bytes,
-                                    file_name="updated_resume.pdf",
-                                    mime="application/pdf"
-                                )
+                # Display final results
+                status.success("✨ Analysis Complete!")
+                for field in RESULT_FIELDS:
+                    render_field(placeholders[field], field, response_json.get(field))
+                analyzed_now = True
                 
         except Exception as e:
             st.error(f"An error occurred: {str(e)}")
             
         finally:
             st.session_state.processing = False
+    
+    # On other reruns (e.g. ticking the checkbox) show the stored analysis instead of recomputing it
+    result = st.session_state.analysis_result
+    if not result or st.session_state.analysis_key != current_key:
+        return
+    if not analyzed_now:
+        for field in RESULT_FIELDS:
+            render_field(st.empty(), field, result.get(field))
+    
+    # Update Word document (if applicable), driven by the stored analysis
+    if is_docx and st.session_state.docx_content:
+        render_tailoring(st.session_state.docx_content, resume_hash, result.get("Improvements", {}))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,59 @@
+import hashlib
+import os
+import tempfile
+
+# Directory for generated resumes; set RESUMEAI_ARTIFACT_DIR to an empty string to disable saving
+ARTIFACT_DIR = os.getenv("RESUMEAI_ARTIFACT_DIR", "saved_resumes")
+
+
+class LocalArtifactStore:
+    """Persist generated files under content-hash names so concurrent writers never collide."""
+
+    def __init__(self, root=ARTIFACT_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def put(self, data, suffix=".pdf", prefix="resume"):
+        """Save data (once per distinct content) and return its path."""
+        digest = hashlib.sha256(data).hexdigest()[:20]
+        path = os.path.join(self.root, f"{prefix}_{digest}{suffix}")
+        if os.path.exists(path):
+            return path
+
+        # Write to a temporary file first so readers never see a partial artifact
+        fd, temp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return path
+
+    def get(self, path):
+        """Return the bytes of a previously saved artifact."""
+        with open(path, "rb") as f:
+            return f.read()
+
+
+class NullArtifactStore:
+    """Artifact store that keeps nothing."""
+
+    def put(self, data, suffix=".pdf", prefix="resume"):
+        return None
+
+    def get(self, path):
+        raise FileNotFoundError(path)
+
+
+_store = None
+
+
+def get_artifact_store():
+    """Return the process-wide artifact store (a NullArtifactStore when saving is disabled)."""
+    global _store
+    if _store is None:
+        _store = LocalArtifactStore() if ARTIFACT_DIR else NullArtifactStore()
+    return _store
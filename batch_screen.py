@@ -0,0 +1,358 @@
+# python batch_screen.py --jd job_description.txt --resumes resumes/ --output ranked.csv
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dotenv import load_dotenv
+from corpus import collect_resumes, extract_resume_text, get_corpus
+from embeddings import semantic_score
+from helper_u import configure_genai, analyze_resume_async
+from jd_store import get_jd_store
+from keywords import missing_keywords
+from prescore import score_resumes, select_candidates
+from response_parser import parse_percentage
+
+
+class RateLimiter:
+    """Space out calls so that no more than `requests_per_minute` start in any minute."""
+
+    def __init__(self, requests_per_minute):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            if self._next_slot > now:
+                await asyncio.sleep(self._next_slot - now)
+                now = loop.time()
+            self._next_slot = max(now, self._next_slot) + self.interval
+
+
+async def screen_resumes(job_description, resumes, concurrency=4, requests_per_minute=60,
+                         extract_workers=None, timeout=None, top_n=None, min_score=None, on_result=None,
+                         extract_pool=None):
+    """Screen resumes against one job description and return results ranked by JD Match.
+
+    The job description is stored in (or reused from) the JD store so its precomputed
+    terms and skills are not rebuilt. Text extraction runs in a process pool,
+    then every resume is scored locally with BM25 and by embedding similarity (and gets
+    locally computed missing keywords) and only the candidates selected by `top_n` /
+    `min_score` are sent to the model.
+    Every resume is stored in the candidate corpus; files seen before skip extraction.
+    Model calls run through an asyncio pipeline bounded by `concurrency` and
+    `requests_per_minute`, each limited to `timeout` seconds. `on_result` is called
+    with each result as soon as it is available. Pass `extract_pool` to reuse a
+    long-lived executor instead of starting one for this call. The JD store, corpus and
+    local scoring work runs in the loop's default thread pool, so only the model calls
+    run on the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    jd_record = await loop.run_in_executor(None, get_jd_store().add, job_description)
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = RateLimiter(requests_per_minute)
+    results = [
+        {
+            "file": name, "resume_id": None, "score": None, "local_score": None, "semantic_score": None,
+            "missing_keywords": None, "skipped": False, "error": None, "analysis": None
+        }
+        for name, _ in resumes
+    ]
+
+    def finish(result):
+        if on_result:
+            on_result(result)
+
+    # Files already in the corpus are not extracted again; new ones are extracted in the pool and stored
+    corpus = await loop.run_in_executor(None, get_corpus)
+    records = await loop.run_in_executor(None, lambda: [corpus.find_file(data) for _, data in resumes])
+    missing = [i for i, record in enumerate(records) if record is None]
+
+    async def extract_all(pool):
+        return await asyncio.gather(
+            *(loop.run_in_executor(pool, extract_resume_text, *resumes[i]) for i in missing),
+            return_exceptions=True
+        )
+
+    if not missing:
+        extracted = []
+    elif extract_pool is not None:
+        extracted = await extract_all(extract_pool)
+    else:
+        with ProcessPoolExecutor(max_workers=extract_workers) as pool:
+            extracted = await extract_all(pool)
+
+    for i, text in zip(missing, extracted):
+        try:
+            if isinstance(text, Exception):
+                raise text
+            records[i] = await loop.run_in_executor(None, corpus.add, resumes[i][0], resumes[i][1], text)
+        except Exception as e:
+            results[i]["error"] = str(e)
+            finish(results[i])
+
+    texts = {}
+    for i, record in enumerate(records):
+        if record is not None:
+            results[i]["resume_id"] = record["id"]
+            texts[i] = record["text"]
+
+    # Local pre-scoring decides which resumes are worth a model call
+    indexes = list(texts)
+
+    def score_locally():
+        local_scores = score_resumes(
+            jd_record["text"],
+            [texts[i] for i in indexes],
+            jd_term_counts=jd_record["term_counts"]
+        )
+        # Embedding similarity from the vectors the corpus stored for each resume
+        semantic = corpus.index.similarities([records[i]["id"] for i in indexes], jd_record["text"])
+        semantic = [
+            score if score is not None else semantic_score(texts[i], jd_record["text"])
+            for i, score in zip(indexes, semantic)
+        ]
+        keywords = [missing_keywords(texts[i], jd_skills=jd_record["skills"]) for i in indexes]
+        return local_scores, semantic, keywords
+
+    local_scores, semantic, keywords = await loop.run_in_executor(None, score_locally)
+    for i, local, similarity, missing_skills in zip(indexes, local_scores, semantic, keywords):
+        results[i]["local_score"] = local["score"]
+        results[i]["semantic_score"] = similarity
+        results[i]["missing_keywords"] = missing_skills
+    selected = [indexes[j] for j in select_candidates(local_scores, top_n=top_n, min_score=min_score)]
+    for i in set(indexes) - set(selected):
+        results[i]["skipped"] = True
+        finish(results[i])
+
+    async def process(i):
+        result = results[i]
+        try:
+            async with semaphore:
+                await limiter.acquire()
+                response = await analyze_resume_async(texts[i], jd_record["text"], timeout=timeout)
+            analysis = json.loads(response)
+            result["analysis"] = analysis
+            result["score"] = parse_percentage(analysis.get("JD Match"))
+        except Exception as e:
+            result["error"] = str(e)
+        finish(result)
+
+    await asyncio.gather(*(process(i) for i in selected))
+
+    # Highest model match first, then resumes ranked only by local score; failures go last
+    return sorted(results, key=lambda r: (
+        r["score"] is None,
+        -(r["score"] or 0),
+        r["local_score"] is None,
+        -(r["local_score"] or 0)
+    ))
+
+
+def _unique_jd_records(job_descriptions):
+    """Add job descriptions to the JD store and return their records, one per distinct JD."""
+    jd_store = get_jd_store()
+    jd_records = {}
+    for job_description in job_descriptions:
+        record = jd_store.add(job_description)
+        jd_records.setdefault(record["id"], record)
+    if not jd_records:
+        raise ValueError("Provide at least one job description")
+    return list(jd_records.values())
+
+
+def _comparison_result(resume_text, jd_record):
+    return {
+        "jd_id": jd_record["id"],
+        "title": jd_record["title"],
+        "score": None,
+        "missing_keywords": missing_keywords(resume_text, jd_skills=jd_record["skills"]),
+        "error": None,
+        "analysis": None,
+    }
+
+
+def _set_analysis(result, response):
+    analysis = json.loads(response)
+    result["analysis"] = analysis
+    result["score"] = parse_percentage(analysis.get("JD Match"))
+
+
+def _rank_comparison(results):
+    # Best match first; failed analyses go last
+    return sorted(results, key=lambda r: (r["score"] is None, -(r["score"] or 0)))
+
+
+async def compare_job_descriptions(resume_text, job_descriptions, concurrency=4, timeout=None, on_result=None,
+                                   analyze=analyze_resume_async):
+    """Analyze one resume against several job descriptions and return results ranked by JD Match.
+
+    The resume is extracted once by the caller and every JD goes through the JD store, so
+    its skills are matched only once. The calls run concurrently,
+    bounded by `concurrency`, and are not spaced out: a handful of JDs fits in the shared
+    scheduler's rate-limit burst, so they finish in about one round-trip. They also share
+    the same prompt prefix, since the resume comes before the job description in the prompt.
+    Identical JDs are analyzed once. Missing keywords are computed locally for every JD.
+    """
+    if not resume_text or not resume_text.strip():
+        raise ValueError("Resume text cannot be empty")
+
+    # The JD store and keyword matching block, so they run off the event loop
+    loop = asyncio.get_running_loop()
+    jd_records = await loop.run_in_executor(None, _unique_jd_records, job_descriptions)
+    base_results = await loop.run_in_executor(
+        None, lambda: [_comparison_result(resume_text, jd_record) for jd_record in jd_records]
+    )
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def process(jd_record, result):
+        try:
+            async with semaphore:
+                response = await analyze(resume_text, jd_record["text"], timeout=timeout)
+            _set_analysis(result, response)
+        except Exception as e:
+            result["error"] = str(e)
+        if on_result:
+            on_result(result)
+        return result
+
+    results = await asyncio.gather(*(process(*pair) for pair in zip(jd_records, base_results)))
+    return _rank_comparison(results)
+
+
+def compare_job_descriptions_sync(resume_text, job_descriptions, analyze, concurrency=4):
+    """Blocking variant of compare_job_descriptions that runs a sync `analyze` in a thread pool.
+
+    For callers without a long-lived event loop (the Streamlit app): the async Gemini
+    clients stay bound to the loop they were first used on, so creating a loop per call
+    would break every call after the first one.
+    """
+    if not resume_text or not resume_text.strip():
+        raise ValueError("Resume text cannot be empty")
+
+    jd_records = _unique_jd_records(job_descriptions)
+
+    def process(jd_record):
+        result = _comparison_result(resume_text, jd_record)
+        try:
+            _set_analysis(result, analyze(resume_text, jd_record["text"]))
+        except Exception as e:
+            result["error"] = str(e)
+        return result
+
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(jd_records)))) as executor:
+        results = list(executor.map(process, jd_records))
+    return _rank_comparison(results)
+
+
+def write_results(results, output_path):
+    """Write ranked results as CSV or JSONL depending on the output file extension."""
+    if output_path.lower().endswith(".jsonl"):
+        with open(output_path, "w", encoding="utf-8") as f:
+            for rank, result in enumerate(results, start=1):
+                f.write(json.dumps({"rank": rank, **result}, ensure_ascii=False) + "\n")
+        return
+
+    with open(output_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow([
+            "rank", "file", "resume_id", "jd_match", "local_score", "semantic_score", "skipped", "missing_keywords",
+            "profile_summary", "error"
+        ])
+        for rank, result in enumerate(results, start=1):
+            analysis = result["analysis"] or {}
+            writer.writerow([
+                rank,
+                result["file"],
+                result["resume_id"] or "",
+                "" if result["score"] is None else result["score"],
+                "" if result["local_score"] is None else result["local_score"],
+                "" if result["semantic_score"] is None else result["semantic_score"],
+                result["skipped"],
+                ", ".join(result["missing_keywords"] or []),
+                analysis.get("Profile Summary", ""),
+                result["error"] or ""
+            ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Screen a batch of resumes against one job description.")
+    jd_source = parser.add_mutually_exclusive_group(required=True)
+    jd_source.add_argument("--jd", help="Path to a text file containing the job description")
+    jd_source.add_argument("--jd-id", help="ID of a job description saved in the JD store")
+    parser.add_argument("--resumes", required=True, help="Directory or zip archive of PDF/DOCX/TXT resumes")
+    parser.add_argument("--output", default="screening_results.csv", help="Ranked output file (.csv or .jsonl)")
+    parser.add_argument("--stream", help="Append each result to this JSONL file as soon as it completes")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum concurrent model calls")
+    parser.add_argument("--rpm", type=int, default=60, help="Maximum model requests per minute")
+    parser.add_argument("--top-n", type=int, default=None,
+                        help="Only send the N best resumes by local score to the model")
+    parser.add_argument("--min-score", type=float, default=None,
+                        help="Only send resumes with at least this local score (0-100) to the model")
+    parser.add_argument("--timeout", type=float, default=120, help="Seconds to wait for each model response")
+    parser.add_argument("--extract-workers", type=int, default=None, help="Processes used for text extraction")
+    args = parser.parse_args()
+
+    load_dotenv()
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise SystemExit("Please set the GEMINI_API_KEY in your .env file")
+    configure_genai(api_key)
+
+    if args.jd_id:
+        jd_record = get_jd_store().get(args.jd_id)
+        if jd_record is None:
+            raise SystemExit(f"No saved job description with ID {args.jd_id}")
+        job_description = jd_record["text"]
+    else:
+        with open(args.jd, encoding="utf-8") as f:
+            job_description = f.read()
+        jd_record = get_jd_store().add(job_description)
+    print(f"Job description ID: {jd_record['id']}")
+    resumes = collect_resumes(args.resumes)
+    print(f"Screening {len(resumes)} resumes...")
+
+    stream_file = open(args.stream, "a", encoding="utf-8") if args.stream else None
+    completed = 0
+
+    def on_result(result):
+        nonlocal completed
+        completed += 1
+        if result["error"]:
+            status = result["error"]
+        elif result["skipped"]:
+            status = f"skipped (local score {result['local_score']})"
+        else:
+            status = f"JD Match {result['score']}"
+        print(f"[{completed}/{len(resumes)}] {result['file']}: {status}")
+        if stream_file:
+            stream_file.write(json.dumps(result, ensure_ascii=False) + "\n")
+            stream_file.flush()
+
+    try:
+        results = asyncio.run(screen_resumes(
+            job_description,
+            resumes,
+            concurrency=args.concurrency,
+            requests_per_minute=args.rpm,
+            extract_workers=args.extract_workers,
+            timeout=args.timeout,
+            top_n=args.top_n,
+            min_score=args.min_score,
+            on_result=on_result
+        ))
+    finally:
+        if stream_file:
+            stream_file.close()
+
+    write_results(results, args.output)
+    print(f"Ranked results saved to: {os.path.abspath(args.output)}")
+
+
+if __name__ == "__main__":
+    main()
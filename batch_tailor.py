@@ -0,0 +1,215 @@
+# python batch_tailor.py --resume resume.docx --jds job_descriptions/ --output tailored.zip
+
+import argparse
+import asyncio
+import copy
+import io
+import json
+import os
+import re
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from docx import Document
+from dotenv import load_dotenv
+from batch_screen import RateLimiter
+from converters import DEFAULT_WORKERS, get_converter
+from corpus import get_corpus
+from helper_u import (
+    configure_genai, analyze_resume_async, apply_improvements, document_to_bytes, extract_docx_text
+)
+from jd_store import get_jd_store
+from response_parser import parse_percentage
+
+JD_EXTENSIONS = (".txt", ".md")
+
+
+def collect_job_descriptions(path):
+    """Return (name, text) pairs for every job description in a directory or zip archive."""
+    job_descriptions = []
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and info.filename.lower().endswith(JD_EXTENSIONS):
+                    job_descriptions.append((info.filename, archive.read(info).decode("utf-8", errors="ignore")))
+    elif os.path.isdir(path):
+        for root, _, files in os.walk(path):
+            for filename in sorted(files):
+                if filename.lower().endswith(JD_EXTENSIONS):
+                    file_path = os.path.join(root, filename)
+                    with open(file_path, encoding="utf-8", errors="ignore") as f:
+                        job_descriptions.append((os.path.relpath(file_path, path), f.read()))
+    else:
+        raise ValueError(f"Job descriptions path must be a directory or zip archive: {path}")
+
+    job_descriptions = [(name, text) for name, text in job_descriptions if text.strip()]
+    if not job_descriptions:
+        raise ValueError(f"No TXT or MD job descriptions found in {path}")
+    return job_descriptions
+
+
+def output_name(name, jd_id):
+    """Return a filesystem-safe base name for the outputs tailored to one job description."""
+    stem = os.path.splitext(os.path.basename(name))[0]
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", stem).strip("-").lower()[:40] or "job"
+    return f"{slug}-{jd_id[:8]}"
+
+
+async def tailor_resumes(base_docx, job_descriptions, concurrency=4, requests_per_minute=60,
+                         timeout=None, convert_pdf=True, convert_workers=None, on_result=None):
+    """Tailor one DOCX resume to many job descriptions.
+
+    The base document is parsed once; every job description gets a deep copy of the
+    parsed tree with its "Improvements" applied, so the DOCX bytes are never re-read.
+    Model calls run concurrently (bounded by `concurrency` and `requests_per_minute`)
+    and PDF conversions run in a thread pool feeding the conversion backend's workers,
+    overlapping with the remaining model calls. Each result holds the generated bytes
+    under "outputs"; `on_result` is called with each result as soon as it is ready.
+    """
+    loop = asyncio.get_running_loop()
+    base_doc = Document(io.BytesIO(base_docx))
+    resume_text = extract_docx_text(base_doc)
+
+    converter = get_converter() if convert_pdf else None
+
+    store = get_jd_store()
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = RateLimiter(requests_per_minute)
+    jd_records = [
+        store.add(text, title=os.path.splitext(os.path.basename(name))[0]) for name, text in job_descriptions
+    ]
+    results = []
+    used_names = set()
+    for (name, _), jd_record in zip(job_descriptions, jd_records):
+        base_name = unique_name = output_name(name, jd_record["id"])
+        suffix = 2
+        while unique_name in used_names:
+            unique_name = f"{base_name}-{suffix}"
+            suffix += 1
+        used_names.add(unique_name)
+        results.append({
+            "job_description": name, "jd_id": jd_record["id"], "name": unique_name,
+            "score": None, "docx": None, "pdf": None, "error": None, "outputs": {}
+        })
+
+    async def process(result, jd_record, convert_pool):
+        try:
+            async with semaphore:
+                await limiter.acquire()
+                response = await analyze_resume_async(resume_text, jd_record["text"], timeout=timeout)
+            analysis = json.loads(response)
+            result["score"] = parse_percentage(analysis.get("JD Match"))
+
+            # Clone the parsed base tree instead of parsing the DOCX again
+            doc = apply_improvements(copy.deepcopy(base_doc), analysis.get("Improvements", {}))
+            docx_bytes = document_to_bytes(doc)
+            result["docx"] = result["name"] + ".docx"
+            result["outputs"]["docx"] = docx_bytes
+
+            if converter is not None:
+                start = time.perf_counter()
+                result["outputs"]["pdf"] = await loop.run_in_executor(convert_pool, converter.convert, docx_bytes)
+                result["pdf"] = result["name"] + ".pdf"
+                result["convert_seconds"] = round(time.perf_counter() - start, 3)
+        except Exception as e:
+            result["error"] = str(e)
+        if on_result:
+            on_result(result)
+
+    with ThreadPoolExecutor(max_workers=convert_workers or DEFAULT_WORKERS) as convert_pool:
+        await asyncio.gather(*(
+            process(result, jd_record, convert_pool) for result, jd_record in zip(results, jd_records)
+        ))
+
+    return results
+
+
+def write_archive(results, output_path, base_name="resume.docx"):
+    """Write the tailored DOCX/PDF files and a manifest.json to a zip archive."""
+    manifest = {
+        "base_resume": base_name,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": [{key: value for key, value in result.items() if key != "outputs"} for result in results],
+    }
+    with zipfile.ZipFile(output_path, "w") as archive:
+        for result in results:
+            for kind, data in result["outputs"].items():
+                # DOCX and PDF files are already compressed
+                archive.writestr(result[kind], data, compress_type=zipfile.ZIP_STORED)
+        archive.writestr(
+            "manifest.json",
+            json.dumps(manifest, ensure_ascii=False, indent=2),
+            compress_type=zipfile.ZIP_DEFLATED
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tailor one DOCX resume to many job descriptions.")
+    resume_source = parser.add_mutually_exclusive_group(required=True)
+    resume_source.add_argument("--resume", help="Path to the base DOCX resume")
+    resume_source.add_argument("--resume-id", help="ID of a resume stored in the candidate corpus (with a DOCX file)")
+    parser.add_argument("--jds", help="Directory or zip archive of TXT/MD job descriptions")
+    parser.add_argument("--jd-id", action="append", default=[],
+                        help="ID of a job description saved in the JD store (repeatable)")
+    parser.add_argument("--output", default="tailored_resumes.zip", help="Zip archive to write")
+    parser.add_argument("--no-pdf", action="store_true", help="Only produce DOCX files")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum concurrent model calls")
+    parser.add_argument("--rpm", type=int, default=60, help="Maximum model requests per minute")
+    parser.add_argument("--timeout", type=float, default=120, help="Seconds to wait for each model response")
+    parser.add_argument("--convert-workers", type=int, default=None,
+                        help="Concurrent PDF conversions (defaults to the backend's worker count)")
+    args = parser.parse_args()
+    if not args.jds and not args.jd_id:
+        parser.error("pass --jds and/or --jd-id")
+
+    load_dotenv()
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise SystemExit("Please set the GEMINI_API_KEY in your .env file")
+    configure_genai(api_key)
+
+    job_descriptions = collect_job_descriptions(args.jds) if args.jds else []
+    for jd_id in args.jd_id:
+        jd_record = get_jd_store().get(jd_id)
+        if jd_record is None:
+            raise SystemExit(f"No saved job description with ID {jd_id}")
+        job_descriptions.append((jd_record["title"] or jd_id, jd_record["text"]))
+
+    if args.resume_id:
+        stored = get_corpus().file(args.resume_id, (".docx",))
+        if stored is None:
+            raise SystemExit(f"No stored DOCX resume with ID {args.resume_id}")
+        resume_name, base_docx = stored
+    else:
+        resume_name = os.path.basename(args.resume)
+        with open(args.resume, "rb") as f:
+            base_docx = f.read()
+        # Store the base resume so later runs can refer to it with --resume-id
+        print(f"Resume ID: {get_corpus().ingest(resume_name, base_docx)['id']}")
+    print(f"Tailoring {resume_name} to {len(job_descriptions)} job descriptions...")
+
+    completed = 0
+
+    def on_result(result):
+        nonlocal completed
+        completed += 1
+        status = result["error"] or f"JD Match {result['score']}"
+        print(f"[{completed}/{len(job_descriptions)}] {result['job_description']}: {status}")
+
+    results = asyncio.run(tailor_resumes(
+        base_docx,
+        job_descriptions,
+        concurrency=args.concurrency,
+        requests_per_minute=args.rpm,
+        timeout=args.timeout,
+        convert_pdf=not args.no_pdf,
+        convert_workers=args.convert_workers,
+        on_result=on_result
+    ))
+
+    write_archive(results, args.output, base_name=resume_name)
+    print(f"Tailored resumes saved to: {os.path.abspath(args.output)}")
+
+
+if __name__ == "__main__":
+    main()
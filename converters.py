@@ -0,0 +1,301 @@
+import atexit
+import os
+import queue
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+DEFAULT_WORKERS = int(os.getenv("RESUMEAI_PDF_WORKERS", "2"))
+# Seconds a conversion may wait for a free worker before giving up
+QUEUE_TIMEOUT = 120
+
+
+class ConversionStats:
+    """Per-backend conversion counters and latency."""
+
+    def __init__(self):
+        self.conversions = 0
+        self.failures = 0
+        self.total_seconds = 0.0
+        self.last_seconds = 0.0
+        self.max_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds, ok=True):
+        with self._lock:
+            self.conversions += 1
+            if not ok:
+                self.failures += 1
+            self.total_seconds += seconds
+            self.last_seconds = seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+
+    @property
+    def average_seconds(self):
+        return self.total_seconds / self.conversions if self.conversions else 0.0
+
+
+class ConversionBackend:
+    """DOCX -> PDF converter working on in-memory bytes with a bounded pool of workers.
+
+    Subclasses put one handle per worker into `self._workers` and implement
+    `_convert(worker, docx_bytes)`. Callers beyond the pool size queue for a free worker.
+    """
+
+    name = "base"
+
+    def __init__(self, queue_timeout=QUEUE_TIMEOUT):
+        self.queue_timeout = queue_timeout
+        self.stats = ConversionStats()
+        self._workers = queue.Queue()
+
+    def convert(self, docx_bytes):
+        """Convert DOCX bytes to PDF bytes."""
+        try:
+            worker = self._workers.get(timeout=self.queue_timeout)
+        except queue.Empty:
+            raise Exception(f"No {self.name} conversion worker became free within {self.queue_timeout} seconds")
+
+        start = time.perf_counter()
+        ok = False
+        try:
+            pdf_bytes = self._convert(worker, docx_bytes)
+            ok = True
+            return pdf_bytes
+        finally:
+            self.stats.record(time.perf_counter() - start, ok)
+            self._workers.put(worker)
+
+    def _convert(self, worker, docx_bytes):
+        raise NotImplementedError
+
+    def close(self):
+        """Release any processes held by the backend."""
+
+
+class UnoserverBackend(ConversionBackend):
+    """Pool of warm headless LibreOffice instances, each driven through its own unoserver.
+
+    Before each conversion the worker's unoserver process is checked, and one that has
+    exited (unoserver stops when its LibreOffice crashes) is started again, so a crash
+    costs one restart instead of failing every conversion routed to that worker.
+
+    Started servers listen on free ports picked when they start, so several processes
+    (Streamlit, API workers, job workers, the bot) can each run a pool side by side.
+    Pass `base_port` with `start_servers=False` to use servers that are already running
+    on base_port, base_port + 2, ...
+    """
+
+    name = "unoserver"
+
+    def __init__(self, workers=DEFAULT_WORKERS, base_port=2003, start_servers=True,
+                 host="127.0.0.1", conversion_timeout=120, queue_timeout=QUEUE_TIMEOUT):
+        super().__init__(queue_timeout)
+        from unoserver.client import UnoClient
+
+        self._client_class = UnoClient
+        self.host = host
+        self.conversion_timeout = conversion_timeout
+        self.restarts = 0
+        # Worker -> (XML-RPC port for unoserver, UNO port for LibreOffice)
+        self._ports = {}
+        self._processes = {}
+        self._profiles = {}
+        self._clients = {}
+        for i in range(workers):
+            if start_servers:
+                self._profiles[i] = tempfile.mkdtemp(prefix=f"resumeai-lo-{i}-")
+                self._start_server(i)
+            else:
+                self._ports[i] = (base_port + 2 * i, base_port + 2 * i + 1)
+            self._clients[i] = self._make_client(i)
+            self._workers.put(i)
+        atexit.register(self.close)
+
+    def _free_ports(self):
+        # Both sockets are held open until both ports are known, so the two ports differ
+        sockets = [socket.socket(socket.AF_INET, socket.SOCK_STREAM) for _ in range(2)]
+        try:
+            for sock in sockets:
+                sock.bind((self.host, 0))
+            return tuple(sock.getsockname()[1] for sock in sockets)
+        finally:
+            for sock in sockets:
+                sock.close()
+
+    def _start_server(self, worker):
+        # Fresh ports on every start, so a port taken meanwhile by another process only costs one restart
+        port, uno_port = self._ports[worker] = self._free_ports()
+        self._processes[worker] = subprocess.Popen(
+            [
+                "unoserver",
+                "--interface", self.host,
+                "--port", str(port),
+                "--uno-port", str(uno_port),
+                "--user-installation", f"file://{self._profiles[worker]}",
+                "--conversion-timeout", str(self.conversion_timeout),
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+
+    def _make_client(self, worker):
+        # The client retries its first connection while LibreOffice starts up
+        return self._client_class(server=self.host, port=str(self._ports[worker][0]), host_location="remote")
+
+    def _restart_if_dead(self, worker):
+        """Start the worker's unoserver again if it has exited; return True if it was restarted."""
+        process = self._processes.get(worker)
+        if process is None or process.poll() is None:
+            return False
+        self._start_server(worker)
+        self._clients[worker] = self._make_client(worker)
+        self.restarts += 1
+        return True
+
+    def _convert(self, worker, docx_bytes):
+        self._restart_if_dead(worker)
+        try:
+            return self._clients[worker].convert(indata=docx_bytes, convert_to="pdf")
+        except Exception:
+            # The server may have died during this conversion; retry once on a fresh one
+            if not self._restart_if_dead(worker):
+                raise
+            return self._clients[worker].convert(indata=docx_bytes, convert_to="pdf")
+
+    def close(self):
+        processes = list(self._processes.values())
+        self._processes = {}
+        for process in processes:
+            if process.poll() is None:
+                process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        for profile in self._profiles.values():
+            shutil.rmtree(profile, ignore_errors=True)
+        self._profiles = {}
+
+
+class SofficeBackend(ConversionBackend):
+    """Headless LibreOffice run per conversion, with one reusable profile per worker.
+
+    Reusing profiles skips LibreOffice's first-start initialization and lets
+    several conversions run side by side without profile lock conflicts.
+    """
+
+    name = "soffice"
+
+    def __init__(self, workers=DEFAULT_WORKERS, executable=None, timeout=120, queue_timeout=QUEUE_TIMEOUT):
+        super().__init__(queue_timeout)
+        self.executable = executable or shutil.which("soffice") or shutil.which("libreoffice")
+        if not self.executable:
+            raise Exception("LibreOffice (soffice) is not installed")
+        self.timeout = timeout
+        self._profiles = []
+        for i in range(workers):
+            profile = tempfile.mkdtemp(prefix=f"resumeai-soffice-{i}-")
+            self._profiles.append(profile)
+            self._workers.put(profile)
+        atexit.register(self.close)
+
+    def _convert(self, worker, docx_bytes):
+        # soffice only converts files, so this backend needs a scratch directory
+        with tempfile.TemporaryDirectory() as work_dir:
+            docx_path = os.path.join(work_dir, "resume.docx")
+            with open(docx_path, "wb") as f:
+                f.write(docx_bytes)
+            subprocess.run(
+                [
+                    self.executable,
+                    f"-env:UserInstallation=file://{worker}",
+                    "--headless", "--norestore",
+                    "--convert-to", "pdf",
+                    "--outdir", work_dir,
+                    docx_path,
+                ],
+                check=True,
+                timeout=self.timeout,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE
+            )
+            with open(os.path.join(work_dir, "resume.pdf"), "rb") as f:
+                return f.read()
+
+    def close(self):
+        for profile in self._profiles:
+            shutil.rmtree(profile, ignore_errors=True)
+        self._profiles = []
+
+
+class Docx2PdfBackend(ConversionBackend):
+    """Microsoft Word automation through docx2pdf (Windows and macOS only)."""
+
+    name = "docx2pdf"
+
+    def __init__(self, queue_timeout=QUEUE_TIMEOUT):
+        super().__init__(queue_timeout)
+        from docx2pdf import convert
+        self._docx2pdf_convert = convert
+        # Word automation is not safe to drive concurrently
+        self._workers.put(None)
+
+    def _convert(self, worker, docx_bytes):
+        with tempfile.TemporaryDirectory() as work_dir:
+            docx_path = os.path.join(work_dir, "resume.docx")
+            pdf_path = os.path.join(work_dir, "resume.pdf")
+            with open(docx_path, "wb") as f:
+                f.write(docx_bytes)
+            self._docx2pdf_convert(docx_path, pdf_path)
+            with open(pdf_path, "rb") as f:
+                return f.read()
+
+
+BACKENDS = {
+    "unoserver": UnoserverBackend,
+    "soffice": SofficeBackend,
+    "docx2pdf": Docx2PdfBackend,
+}
+
+_converter = None
+_converter_lock = threading.Lock()
+
+
+def _auto_backend():
+    if shutil.which("unoserver"):
+        try:
+            import unoserver.client  # noqa: F401
+            return UnoserverBackend()
+        except ImportError:
+            pass
+    if shutil.which("soffice") or shutil.which("libreoffice"):
+        return SofficeBackend()
+    if sys.platform in ("win32", "darwin"):
+        return Docx2PdfBackend()
+    raise Exception("No DOCX to PDF converter available: install LibreOffice (and optionally unoserver)")
+
+
+def active_converter():
+    """Return the process-wide conversion backend if one has been started, without starting one."""
+    return _converter
+
+
+def get_converter():
+    """Return the process-wide conversion backend, chosen by RESUMEAI_PDF_BACKEND (default "auto")."""
+    global _converter
+    with _converter_lock:
+        if _converter is None:
+            backend = os.getenv("RESUMEAI_PDF_BACKEND", "auto")
+            if backend == "auto":
+                _converter = _auto_backend()
+            elif backend in BACKENDS:
+                _converter = BACKENDS[backend]()
+            else:
+                raise Exception(f"Unknown PDF backend: {backend}")
+        return _converter
@@ -0,0 +1,284 @@
+# python corpus.py ingest --resumes resumes.zip
+# python corpus.py search --jd job_description.txt --top-n 50
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from cache import CACHE_DIR, normalize_text
+from docx_sections import text_sections
+from embeddings import get_embedding_index
+from helper_u import extract_pdf_text, extract_docx_text
+from jd_store import get_jd_store
+from prompt_budget import MAX_RESUME_CHARS
+
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".txt")
+
+
+def collect_resumes(path):
+    """Return (name, bytes) pairs for every supported resume in a directory or zip archive."""
+    resumes = []
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and info.filename.lower().endswith(SUPPORTED_EXTENSIONS):
+                    resumes.append((info.filename, archive.read(info)))
+    elif os.path.isdir(path):
+        for root, _, files in os.walk(path):
+            for filename in sorted(files):
+                if filename.lower().endswith(SUPPORTED_EXTENSIONS):
+                    file_path = os.path.join(root, filename)
+                    with open(file_path, "rb") as f:
+                        resumes.append((os.path.relpath(file_path, path), f.read()))
+    else:
+        raise ValueError(f"Resumes path must be a directory or zip archive: {path}")
+
+    if not resumes:
+        raise ValueError(f"No PDF, DOCX or TXT resumes found in {path}")
+    return resumes
+
+
+def extract_resume_text(name, data, workers=1):
+    """Extract text from resume bytes based on the file extension.
+
+    Usually runs in a pool worker, so PDF pages are extracted serially unless `workers` says otherwise.
+    PDF extraction stops once the text exceeds what the resume prompt budget could use.
+    """
+    lower_name = name.lower()
+    if lower_name.endswith(".pdf"):
+        return extract_pdf_text(io.BytesIO(data), max_chars=MAX_RESUME_CHARS, workers=workers)
+    if lower_name.endswith(".docx"):
+        return extract_docx_text(io.BytesIO(data))
+    return data.decode("utf-8", errors="ignore")
+
+
+def make_resume_id(resume_text):
+    """Return the stable ID of a resume, derived from its normalized text."""
+    return hashlib.sha256(normalize_text(resume_text).encode("utf-8")).hexdigest()[:16]
+
+
+class CandidateCorpus:
+    """Local store of candidate resumes: original files as blobs, text and sections in SQLite.
+
+    Files are deduplicated by a hash of their bytes, so a file seen before is never
+    extracted again, and resumes by a hash of their normalized text, so the same resume
+    uploaded as PDF and DOCX (or re-exported) is stored and analyzed once. Every stored
+    resume is also added to the embedding index under its ID.
+    """
+
+    def __init__(self, directory=os.path.join(CACHE_DIR, "corpus"), index=None):
+        self.directory = directory
+        self.blob_dir = os.path.join(directory, "blobs")
+        self._index = index
+        self._lock = threading.Lock()
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(directory, "corpus.sqlite3"), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS resumes ("
+            "id TEXT PRIMARY KEY, name TEXT NOT NULL, text TEXT NOT NULL, sections TEXT NOT NULL, "
+            "created_at REAL NOT NULL, used_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "byte_hash TEXT PRIMARY KEY, resume_id TEXT NOT NULL, name TEXT NOT NULL, "
+            "extension TEXT NOT NULL, size INTEGER NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_files_resume ON files (resume_id)")
+        self._conn.commit()
+
+    @property
+    def index(self):
+        return self._index or get_embedding_index()
+
+    def _blob_path(self, byte_hash, extension):
+        return os.path.join(self.blob_dir, byte_hash[:2], byte_hash + extension)
+
+    def find_file(self, data):
+        """Return the resume stored for these exact bytes, or None (no extraction)."""
+        byte_hash = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            row = self._conn.execute("SELECT resume_id FROM files WHERE byte_hash = ?", (byte_hash,)).fetchone()
+        return self.get(row[0]) if row else None
+
+    def add(self, name, data, resume_text):
+        """Store a resume file with its already extracted text and return the resume record.
+
+        A file whose text matches a stored resume is linked to that resume instead of
+        creating a new one.
+        """
+        if not resume_text or not resume_text.strip():
+            raise ValueError(f"No text could be extracted from {name}")
+        byte_hash = hashlib.sha256(data).hexdigest()
+        extension = os.path.splitext(name)[1].lower()
+        resume_id = make_resume_id(resume_text)
+        sections = [{"title": title, "text": body} for title, body in text_sections(resume_text)]
+
+        # Write the blob first so a stored file row always has its bytes
+        blob_path = self._blob_path(byte_hash, extension)
+        if not os.path.exists(blob_path):
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            # A unique temporary file per write, so concurrent ingests of the same file cannot interleave
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(blob_path), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(temp_path, blob_path)
+            except Exception:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+
+        now = time.time()
+        with self._lock:
+            is_new = self._conn.execute(
+                "INSERT OR IGNORE INTO resumes (id, name, text, sections, created_at, used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (resume_id, os.path.basename(name), resume_text, json.dumps(sections), now, now),
+            ).rowcount == 1
+            self._conn.execute(
+                "INSERT OR IGNORE INTO files (byte_hash, resume_id, name, extension, size, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (byte_hash, resume_id, os.path.basename(name), extension, len(data), now),
+            )
+            self._conn.commit()
+        if is_new:
+            self.index.add(resume_id, text=resume_text, name=os.path.basename(name))
+        return self.get(resume_id)
+
+    def ingest(self, name, data):
+        """Return the resume record for a file, extracting and storing it only if it is new (blocking)."""
+        record = self.find_file(data)
+        if record is None:
+            # Called outside any pool, so PDF pages may be extracted in parallel
+            record = self.add(name, data, extract_resume_text(name, data, workers=None))
+        return record
+
+    def get(self, resume_id):
+        """Return the record for resume_id, or None if it is not stored."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT name, text, sections, created_at FROM resumes WHERE id = ?", (resume_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE resumes SET used_at = ? WHERE id = ?", (time.time(), resume_id))
+            self._conn.commit()
+        name, text, sections, created_at = row
+        return {"id": resume_id, "name": name, "text": text, "sections": json.loads(sections), "created_at": created_at}
+
+    def file(self, resume_id, extensions=SUPPORTED_EXTENSIONS):
+        """Return (name, bytes) of the most recent stored file of a resume with one of extensions, or None."""
+        placeholders = ", ".join("?" for _ in extensions)
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT byte_hash, name, extension FROM files WHERE resume_id = ? AND extension IN ({placeholders}) "
+                "ORDER BY created_at DESC LIMIT 1",
+                (resume_id, *extensions),
+            ).fetchone()
+        if row is None:
+            return None
+        byte_hash, name, extension = row
+        with open(self._blob_path(byte_hash, extension), "rb") as f:
+            return name, f.read()
+
+    def list(self, limit=100):
+        """Return (id, name) pairs for stored resumes, most recently used first."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, name FROM resumes ORDER BY used_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+
+    def search(self, job_description, top_k=50):
+        """Return the stored resumes most similar to a job description by embedding, best first."""
+        return [
+            {"resume_id": result["content_hash"], "name": result["name"], "similarity": result["similarity"]}
+            for result in self.index.search(job_description, top_k=top_k)
+        ]
+
+    def delete(self, resume_id):
+        """Remove a resume, its files and its vector."""
+        with self._lock:
+            files = self._conn.execute(
+                "SELECT byte_hash, extension FROM files WHERE resume_id = ?", (resume_id,)
+            ).fetchall()
+            self._conn.execute("DELETE FROM files WHERE resume_id = ?", (resume_id,))
+            self._conn.execute("DELETE FROM resumes WHERE id = ?", (resume_id,))
+            self._conn.commit()
+        for byte_hash, extension in files:
+            try:
+                os.remove(self._blob_path(byte_hash, extension))
+            except FileNotFoundError:
+                pass
+        self.index.remove(resume_id)
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM resumes").fetchone()[0]
+
+
+_default_corpus = None
+
+
+def get_corpus():
+    """Return the process-wide CandidateCorpus."""
+    global _default_corpus
+    if _default_corpus is None:
+        _default_corpus = CandidateCorpus()
+    return _default_corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Store resumes in the candidate corpus and search it by job description.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    ingest_parser = commands.add_parser("ingest", help="Add resumes to the corpus")
+    ingest_parser.add_argument("--resumes", required=True, help="Directory or zip archive of PDF/DOCX/TXT resumes")
+    ingest_parser.add_argument("--workers", type=int, default=None, help="Processes used for text extraction")
+    search_parser = commands.add_parser("search", help="List the stored resumes closest to a job description")
+    jd_source = search_parser.add_mutually_exclusive_group(required=True)
+    jd_source.add_argument("--jd", help="Path to a text file containing the job description")
+    jd_source.add_argument("--jd-id", help="ID of a job description saved in the JD store")
+    search_parser.add_argument("--top-n", type=int, default=50, help="Number of resumes to list")
+    args = parser.parse_args()
+
+    corpus = get_corpus()
+    if args.command == "ingest":
+        # Files seen before are recognized by their bytes and not extracted again
+        resumes = collect_resumes(args.resumes)
+        new_files = [(name, data) for name, data in resumes if corpus.find_file(data) is None]
+        print(f"Extracting {len(new_files)} new files ({len(resumes) - len(new_files)} already stored)...")
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            futures = [(name, data, pool.submit(extract_resume_text, name, data)) for name, data in new_files]
+            for name, data, future in futures:
+                try:
+                    corpus.add(name, data, future.result())
+                except Exception as e:
+                    print(f"{name}: {e}")
+        print(f"Corpus holds {len(corpus)} resumes")
+        return
+
+    if args.jd_id:
+        jd_record = get_jd_store().get(args.jd_id)
+        if jd_record is None:
+            raise SystemExit(f"No saved job description with ID {args.jd_id}")
+        job_description = jd_record["text"]
+    else:
+        with open(args.jd, encoding="utf-8") as f:
+            job_description = f.read()
+    started = time.perf_counter()
+    results = corpus.search(job_description, top_k=args.top_n)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    for rank, result in enumerate(results, start=1):
+        print(f"{rank:>3}. {result['similarity']:5.1f}  {result['name']}  ({result['resume_id']})")
+    print(f"Searched {len(corpus)} resumes in {elapsed_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
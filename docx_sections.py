@@ -0,0 +1,141 @@
+from docx.enum.style import WD_STYLE_TYPE
+from docx.oxml.ns import qn
+from docx.text.paragraph import Paragraph
+
+# Section name -> substrings that identify its heading
+SECTION_KEYWORDS = {
+    "Experience": ("experience", "work"),
+    "Skills": ("skill",),
+    "Projects": ("project",),
+}
+
+# Other common resume headings; they end the preceding section
+COMMON_HEADINGS = (
+    "summary", "objective", "profile", "education", "certification", "achievement",
+    "award", "language", "interest", "publication", "contact", "volunteer", "reference",
+)
+
+MAX_HEADING_WORDS = 4
+MAX_HEADING_CHARS = 40
+
+
+def section_name(text):
+    """Return the section a heading text belongs to, or None for other headings."""
+    lower = text.lower()
+    for name, keywords in SECTION_KEYWORDS.items():
+        if any(keyword in lower for keyword in keywords):
+            return name
+    return None
+
+
+def is_heading(text, style_name, bold=False):
+    """Decide whether a paragraph starts a section.
+
+    Heading-styled paragraphs always do. Other paragraphs qualify when they are a short,
+    heading-like line (upper case, title case or bold, without sentence punctuation)
+    naming a known section.
+    """
+    if style_name and (style_name.startswith("Heading") or style_name == "Title"):
+        return True
+    label = text.rstrip(":").strip()
+    if len(label) > MAX_HEADING_CHARS or len(label.split()) > MAX_HEADING_WORDS:
+        return False
+    if not label or label[-1] in ".,;":
+        return False
+    if not (label.isupper() or label.istitle() or bold):
+        return False
+    lower = label.lower()
+    return section_name(label) is not None or any(heading in lower for heading in COMMON_HEADINGS)
+
+
+def text_sections(text):
+    """Split extracted resume text into (title, body) sections using the same heading rules.
+
+    Lines before the first heading form a section titled "". Works on text from any
+    extractor (PDF, DOCX or plain text), where heading styles are no longer available.
+    """
+    sections = []
+    title, lines = "", []
+    for line in (text or "").splitlines():
+        stripped = line.strip()
+        if stripped and is_heading(stripped, None):
+            if title or any(lines):
+                sections.append((title, "\n".join(lines).strip()))
+            title, lines = stripped.rstrip(":").strip(), []
+        else:
+            lines.append(stripped)
+    if title or any(lines):
+        sections.append((title, "\n".join(lines).strip()))
+    return sections
+
+
+class SectionIndex:
+    """Index of a document's sections built in one pass over the body.
+
+    Each section keeps references to its heading element and to its last body element
+    (paragraph or table). Inserting after a section moves that reference forward, so
+    any number of edits costs O(1) each and never works from stale positions.
+    """
+
+    def __init__(self, doc):
+        self.doc = doc
+        self.sections = []
+        self._by_name = {}
+
+        # Resolve style names once; python-docx looks them up with an XPath query per access
+        style_names = {}
+        default_style = None
+        for style in doc.styles.element.style_lst:
+            style_names[style.styleId] = style.name_val
+            if style.type == WD_STYLE_TYPE.PARAGRAPH and style.default:
+                default_style = style.name_val
+
+        current = None
+        for element in doc.element.body.iterchildren():
+            if element.tag == qn("w:sectPr"):
+                continue
+            if element.tag == qn("w:p"):
+                paragraph = Paragraph(element, doc._body)
+                text = paragraph.text.strip()
+                style_id = element.style
+                style_name = style_names.get(style_id, default_style) if style_id else default_style
+                bold = bool(paragraph.runs) and all(run.bold for run in paragraph.runs if run.text.strip())
+                if text and is_heading(text, style_name, bold):
+                    current = {
+                        "name": section_name(text),
+                        "title": text,
+                        "style": style_name,
+                        "heading": element,
+                        "last": element,
+                    }
+                    self.sections.append(current)
+                    if current["name"] and current["name"] not in self._by_name:
+                        self._by_name[current["name"]] = current
+                    continue
+            if current is not None:
+                current["last"] = element
+
+    def get(self, name):
+        """Return the first section called name, or None."""
+        return self._by_name.get(name)
+
+    def append(self, name, element):
+        """Move element to the end of the named section; return False if there is no such section."""
+        section = self._by_name.get(name)
+        if section is None:
+            return False
+        section["last"].addnext(element)
+        section["last"] = element
+        return True
+
+    def append_paragraph(self, name, text, style=None):
+        """Add a paragraph at the end of the named section and return it (or None)."""
+        if name not in self._by_name:
+            return None
+        if style is not None and style not in self.doc.styles:
+            # The document does not define the requested style; checked up front because
+            # add_paragraph appends the paragraph before it looks the style up
+            style = None
+        paragraph = self.doc.add_paragraph(text, style=style)
+        self.append(name, paragraph._p)
+        return paragraph
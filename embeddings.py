@@ -0,0 +1,235 @@
+import os
+import sqlite3
+import threading
+import time
+import zlib
+import numpy as np
+from cache import CACHE_DIR
+from docx_sections import text_sections
+from prescore import tokenize
+
+EMBEDDING_DIM = 512
+# Bump whenever featurization or row keys change; vectors from other versions live in their own files
+EMBEDDING_VERSION = 2
+# Sections longer than this many words are embedded in several chunks
+CHUNK_WORDS = 120
+# Character trigrams let inflections and variants ("develop", "developer") overlap, at a lower weight than words
+TRIGRAM_WEIGHT = 0.3
+SIGN_BIT = 0x80000000
+
+
+def _hash_features(features):
+    """Return (column, sign) arrays for hashed features."""
+    hashes = np.fromiter(
+        (zlib.crc32(feature.encode("utf-8")) for feature in features), dtype=np.uint32, count=len(features)
+    )
+    return hashes % EMBEDDING_DIM, np.where(hashes & SIGN_BIT, -1.0, 1.0).astype(np.float32)
+
+
+def embed_text(text):
+    """Embed text as an L2-normalized hashed vector of words, word pairs and character trigrams."""
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    tokens = tokenize(text)
+    if not tokens:
+        return vector
+
+    words = tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+    trigrams = [f"<{token}>"[i:i + 3] for token in tokens if len(token) > 2 for i in range(len(token))]
+    columns, signs = _hash_features(words)
+    np.add.at(vector, columns, signs)
+    if trigrams:
+        columns, signs = _hash_features(trigrams)
+        np.add.at(vector, columns, signs * TRIGRAM_WEIGHT)
+
+    # Sublinear term frequency so repeated terms do not dominate
+    vector = np.sign(vector) * np.log1p(np.abs(vector))
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def chunk_text(text, max_words=CHUNK_WORDS):
+    """Split text into section chunks of at most max_words words."""
+    chunks = []
+    for _, body in text_sections(text):
+        words = body.split()
+        for start in range(0, len(words), max_words):
+            chunks.append(" ".join(words[start:start + max_words]))
+    return chunks
+
+
+def embed_document(text):
+    """Embed a resume or JD as the normalized mean of its section chunk vectors.
+
+    Each chunk is normalized before averaging, so a long section (such as a detailed
+    experience list) does not drown out a short one (such as skills).
+    """
+    chunks = chunk_text(text)
+    if not chunks:
+        return np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    vector = np.mean([embed_text(chunk) for chunk in chunks], axis=0)
+    norm = np.linalg.norm(vector)
+    return (vector / norm if norm else vector).astype(np.float32)
+
+
+def _as_percent(similarity):
+    return round(max(0.0, float(similarity)) * 100, 1)
+
+
+def semantic_score(resume_text, job_description):
+    """Return the 0-100 embedding similarity of a resume and a job description (no API call)."""
+    return _as_percent(embed_document(resume_text) @ embed_document(job_description))
+
+
+class EmbeddingIndex:
+    """Resume vectors in a memory-mapped float32 matrix, addressed by content hash (the corpus resume ID).
+
+    Row metadata lives in SQLite; the matrix file only grows, and removed rows are
+    masked out. Searches are exact: one matrix-vector product over the memory map
+    followed by a partial sort, which takes milliseconds for tens of thousands of
+    resumes. Several processes may add to the same index.
+    """
+
+    def __init__(self, directory=os.path.join(CACHE_DIR, "embeddings")):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        prefix = os.path.join(directory, f"resumes-v{EMBEDDING_VERSION}-{EMBEDDING_DIM}")
+        self.matrix_path = prefix + ".f32"
+        self._lock = threading.Lock()
+        # Autocommit mode so adds can take the write lock with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(prefix + ".sqlite3", timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS vectors ("
+            "content_hash TEXT PRIMARY KEY, row INTEGER NOT NULL UNIQUE, name TEXT, created_at REAL NOT NULL)"
+        )
+        self._version = None
+        self._matrix = None
+        self._hashes = []
+        self._names = []
+        self._live = np.zeros(0, dtype=bool)
+        # Rows are written at offsets derived from the metadata, so bytes left by an add
+        # that never committed are simply overwritten by the next one
+        open(self.matrix_path, "ab").close()
+
+    def _row_count(self):
+        return self._conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM vectors").fetchone()[0]
+
+    def _refresh(self):
+        # data_version changes whenever another connection commits; our own writes reset _version
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._version and self._matrix is not None:
+            return
+        row_count = self._row_count()
+        self._hashes = [None] * row_count
+        self._names = [None] * row_count
+        self._live = np.zeros(row_count, dtype=bool)
+        for content_hash, row, name in self._conn.execute("SELECT content_hash, row, name FROM vectors"):
+            self._hashes[row] = content_hash
+            self._names[row] = name
+            self._live[row] = True
+        self._matrix = (
+            np.memmap(self.matrix_path, dtype=np.float32, mode="r", shape=(row_count, EMBEDDING_DIM))
+            if row_count else np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+        )
+        self._version = version
+
+    def __contains__(self, content_hash):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM vectors WHERE content_hash = ?", (content_hash,)
+            ).fetchone() is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+
+    def add(self, content_hash, text=None, name=None, vector=None):
+        """Store the vector of a resume (embedding text unless vector is given); return False if present."""
+        if vector is None:
+            vector = embed_document(text)
+        return self.add_many([(content_hash, name, vector)]) == 1
+
+    def add_many(self, items):
+        """Store (content_hash, name, vector) items in one transaction; return how many were new."""
+        added = 0
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._row_count()
+                with open(self.matrix_path, "r+b") as f:
+                    for content_hash, name, vector in items:
+                        if self._conn.execute(
+                            "SELECT 1 FROM vectors WHERE content_hash = ?", (content_hash,)
+                        ).fetchone():
+                            continue
+                        f.seek(row * EMBEDDING_DIM * 4)
+                        f.write(np.asarray(vector, dtype=np.float32).tobytes())
+                        self._conn.execute(
+                            "INSERT INTO vectors (content_hash, row, name, created_at) VALUES (?, ?, ?, ?)",
+                            (content_hash, row, name, time.time()),
+                        )
+                        row += 1
+                        added += 1
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            if added:
+                self._version = None
+        return added
+
+    def remove(self, content_hash):
+        """Drop a resume from search results (its row stays in the matrix file)."""
+        with self._lock:
+            self._conn.execute("DELETE FROM vectors WHERE content_hash = ?", (content_hash,))
+            self._version = None
+
+    def similarities(self, content_hashes, query_text):
+        """Return the 0-100 similarity of each stored resume to query_text (None for hashes not in the index).
+
+        Uses the stored vectors, so only the query is embedded.
+        """
+        query = embed_document(query_text)
+        with self._lock:
+            self._refresh()
+            rows = [
+                self._conn.execute("SELECT row FROM vectors WHERE content_hash = ?", (content_hash,)).fetchone()
+                for content_hash in content_hashes
+            ]
+            return [
+                _as_percent(self._matrix[row[0]] @ query) if row is not None and row[0] < len(self._live) else None
+                for row in rows
+            ]
+
+    def search(self, query_text, top_k=50):
+        """Return up to top_k resumes most similar to query_text, best first."""
+        query = embed_document(query_text)
+        with self._lock:
+            self._refresh()
+            live_count = int(self._live.sum())
+            if not live_count or not query.any():
+                return []
+            scores = np.asarray(self._matrix @ query)
+            scores[~self._live] = -np.inf
+            k = min(top_k, live_count)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [
+                {
+                    "content_hash": self._hashes[row],
+                    "name": self._names[row],
+                    "similarity": _as_percent(scores[row]),
+                }
+                for row in top
+            ]
+
+
+_default_index = None
+
+
+def get_embedding_index():
+    """Return the process-wide EmbeddingIndex."""
+    global _default_index
+    if _default_index is None:
+        _default_index = EmbeddingIndex()
+    return _default_index
@@ -0,0 +1,349 @@
+import asyncio
+import os
+import random
+import threading
+import time
+import google.generativeai as genai
+from google.api_core import exceptions as api_exceptions
+from cache import make_cache_key
+from prompt_budget import estimate_tokens
+
+DEFAULT_MODEL = 'gemini-2.0-flash'
+DEFAULT_TIMEOUT = 120
+
+# Client-side quota shared by every call in the process; 0 disables a limit
+REQUESTS_PER_MINUTE = int(os.getenv("GEMINI_RPM", "60"))
+TOKENS_PER_MINUTE = int(os.getenv("GEMINI_TPM", "1000000"))
+# Output tokens reserved per request on top of the prompt estimate
+EXPECTED_OUTPUT_TOKENS = 1024
+MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "4"))
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+# Quota, server and gateway errors are worth retrying; anything else fails immediately
+RETRIABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def get_model(model_name=DEFAULT_MODEL):
+    """Return a shared GenerativeModel for model_name, creating it on first use.
+
+    The model object holds the underlying API clients, so reusing it avoids
+    per-call setup and keeps connections open between requests.
+    """
+    with _models_lock:
+        model = _models.get(model_name)
+        if model is None:
+            model = genai.GenerativeModel(model_name)
+            _models[model_name] = model
+        return model
+
+
+def is_retriable(error):
+    """Return True for quota (429) and transient server errors from the API."""
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError)):
+        # Request timeouts are the caller's deadline, so they are not retried
+        return False
+    return getattr(error, "code", None) in RETRIABLE_STATUS_CODES or isinstance(error, ConnectionError)
+
+
+def backoff_delay(attempt):
+    """Exponential backoff with full jitter for the given retry attempt (0-based)."""
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+class TokenBucketLimiter:
+    """Requests-per-minute and tokens-per-minute buckets shared by threads and event loops.
+
+    `reserve` takes capacity immediately (the buckets may go negative) and returns
+    how long the caller has to wait before sending, so callers are served in order
+    and nobody needs to poll.
+    """
+
+    def __init__(self, requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens):
+        """Reserve one request and `tokens` tokens; return the seconds to wait before sending."""
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._updated
+            self._updated = now
+            wait = 0.0
+            if self.requests_per_minute:
+                rate = self.requests_per_minute / 60.0
+                self._requests = min(self.requests_per_minute, self._requests + elapsed * rate) - 1
+                wait = max(wait, -self._requests / rate)
+            if self.tokens_per_minute:
+                rate = self.tokens_per_minute / 60.0
+                # A single request never waits for more than a full bucket
+                tokens = min(tokens, self.tokens_per_minute)
+                self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * rate) - tokens
+                wait = max(wait, -self._tokens / rate)
+            return wait
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class GeminiScheduler:
+    """Rate limiting, retries with backoff and single-flight coalescing for model calls.
+
+    Identical in-flight requests (same model and prompt) share one API call: later
+    callers wait for the first one's result instead of spending quota again.
+    """
+
+    def __init__(self, limiter=None, max_retries=MAX_RETRIES):
+        self.limiter = limiter or TokenBucketLimiter()
+        self.max_retries = max_retries
+        self.calls = 0
+        self.coalesced = 0
+        self.retries = 0
+        self.throttled_seconds = 0.0
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._async_flights = {}
+
+    def _reserve(self, tokens):
+        wait = self.limiter.reserve(tokens)
+        with self._lock:
+            self.calls += 1
+            self.throttled_seconds += wait
+        return wait
+
+    def _should_retry(self, error, attempt):
+        if attempt >= self.max_retries or not is_retriable(error):
+            return False
+        with self._lock:
+            self.retries += 1
+        return True
+
+    def _call_with_retries(self, request, tokens):
+        attempt = 0
+        while True:
+            time.sleep(self._reserve(tokens))
+            try:
+                return request()
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise
+                time.sleep(backoff_delay(attempt))
+                attempt += 1
+
+    async def _call_with_retries_async(self, request, tokens):
+        attempt = 0
+        while True:
+            await asyncio.sleep(self._reserve(tokens))
+            try:
+                return await request()
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise
+                await asyncio.sleep(backoff_delay(attempt))
+                attempt += 1
+
+    def run(self, key, request, tokens):
+        """Run a blocking request, coalesced with identical in-flight calls from other threads."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = self._call_with_retries(request, tokens)
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    async def run_async(self, key, request, tokens):
+        """Await a request coroutine function, coalesced with identical in-flight calls on this loop.
+
+        The shared call is cancelled only when every caller waiting on it has been cancelled.
+        """
+        flight_key = (asyncio.get_running_loop(), key)
+        flight = self._async_flights.get(flight_key)
+        if flight is None:
+            task = asyncio.ensure_future(self._call_with_retries_async(request, tokens))
+            flight = self._async_flights[flight_key] = {"task": task, "waiters": 0}
+
+            def forget(_, flight=flight):
+                if self._async_flights.get(flight_key) is flight:
+                    del self._async_flights[flight_key]
+
+            task.add_done_callback(forget)
+        else:
+            with self._lock:
+                self.coalesced += 1
+
+        flight["waiters"] += 1
+        try:
+            return await asyncio.shield(flight["task"])
+        finally:
+            flight["waiters"] -= 1
+            if flight["waiters"] == 0 and not flight["task"].done():
+                flight["task"].cancel()
+
+    def stream(self, request, tokens):
+        """Yield from a streaming request, retrying only failures that happen before the first chunk."""
+        attempt = 0
+        while True:
+            time.sleep(self._reserve(tokens))
+            started = False
+            try:
+                for chunk in request():
+                    started = True
+                    yield chunk
+                return
+            except Exception as e:
+                if started or not self._should_retry(e, attempt):
+                    raise
+                time.sleep(backoff_delay(attempt))
+                attempt += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "coalesced": self.coalesced,
+                "retries": self.retries,
+                "throttled_seconds": round(self.throttled_seconds, 1),
+            }
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Return the process-wide GeminiScheduler."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = GeminiScheduler()
+        return _scheduler
+
+
+def request_tokens(prompt):
+    """Tokens to reserve for one request: the prompt estimate plus the expected output."""
+    return estimate_tokens(prompt) + EXPECTED_OUTPUT_TOKENS
+
+
+def generate(prompt, model_name=DEFAULT_MODEL, timeout=DEFAULT_TIMEOUT):
+    """Generate content for prompt (blocking) through the shared scheduler and return the text.
+
+    Raises TimeoutError if an attempt gets no response within the timeout, so a hung
+    call cannot block its thread (or a job worker) forever.
+    """
+    def request():
+        try:
+            response = get_model(model_name).generate_content(prompt, request_options={"timeout": timeout})
+        except api_exceptions.DeadlineExceeded:
+            raise TimeoutError(f"Gemini request timed out after {timeout} seconds")
+        if not response or not response.text:
+            raise Exception("Empty response received from Gemini")
+        return response.text
+
+    return get_scheduler().run(make_cache_key(model_name, prompt), request, request_tokens(prompt))
+
+
+def generate_stream(prompt, model_name=DEFAULT_MODEL):
+    """Stream response text chunks for prompt through the shared scheduler's limiter and retries."""
+    def request():
+        received = False
+        for chunk in get_model(model_name).generate_content(prompt, stream=True):
+            if chunk.text:
+                received = True
+                yield chunk.text
+        if not received:
+            raise Exception("Empty response received from Gemini")
+
+    return get_scheduler().stream(request, request_tokens(prompt))
+
+
+class AsyncGeminiClient:
+    """Non-blocking Gemini client for asyncio batch jobs and the Telegram bot."""
+
+    def __init__(self, default_model=DEFAULT_MODEL, timeout=DEFAULT_TIMEOUT, max_concurrency=None):
+        self.default_model = default_model
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self._semaphore = None
+
+    def _get_semaphore(self):
+        # Created lazily so the semaphore binds to the running event loop
+        if self.max_concurrency and self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def analyze(self, prompt, model_name=None, timeout=None):
+        """Generate content for prompt and return the response text.
+
+        Calls go through the shared scheduler, so they are rate limited, retried on
+        quota and server errors, and coalesced with identical in-flight prompts.
+        Cancelling the awaiting task cancels the in-flight request once no other
+        caller shares it. Raises TimeoutError if an attempt gets no response within the timeout.
+        """
+        model_name = model_name or self.default_model
+        timeout = self.timeout if timeout is None else timeout
+        return await get_scheduler().run_async(
+            make_cache_key(model_name, prompt),
+            lambda: self._request(prompt, model_name, timeout),
+            request_tokens(prompt)
+        )
+
+    async def _request(self, prompt, model_name, timeout):
+        model = get_model(model_name)
+        semaphore = self._get_semaphore()
+
+        try:
+            if semaphore:
+                async with semaphore:
+                    response = await asyncio.wait_for(model.generate_content_async(prompt), timeout)
+            else:
+                response = await asyncio.wait_for(model.generate_content_async(prompt), timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Gemini request timed out after {timeout} seconds")
+
+        if not response or not response.text:
+            raise Exception("Empty response received from Gemini")
+        return response.text
+
+
+_default_client = None
+
+
+def get_client():
+    """Return the process-wide AsyncGeminiClient."""
+    global _default_client
+    if _default_client is None:
+        _default_client = AsyncGeminiClient()
+    return _default_client
+
+
+async def analyze(prompt, model_name=None, timeout=None):
+    """Generate content for prompt with the shared client without blocking the event loop."""
+    return await get_client().analyze(prompt, model_name=model_name, timeout=timeout)
@@ -1,6 +1,19 @@
 import google.generativeai as genai
-import PyPDF2 as pdf
 import json
+import os
+from cache import CACHE_DIR, TieredCache, make_cache_key, normalize_text
+from gemini_client import analyze, generate, generate_stream
+from keywords import missing_keywords
+from pdf_extract import iter_pdf_pages
+from prompt_budget import JD_TOKEN_BUDGET, SECTION_TOKEN_BUDGET, compact_prompt_sections, compact_section
+from response_parser import parse_analysis
+
+MODEL_NAME = 'gemini-2.0-flash'
+# Bump whenever the prompt template changes so stale cached analyses are not reused
+PROMPT_VERSION = 'ats-v3'
+SECTION_PROMPT_VERSION = 'section-v2'
+
+response_cache = TieredCache(os.path.join(CACHE_DIR, "responses.sqlite3"))
 
 def configure_genai(api_key):
     """Configure the Generative AI API with error handling."""
@@ -11,57 +24,115 @@ def configure_genai(api_key):
     
 
 def get_gemini_response(prompt):
-    """Generate a response using Gemini with enhanced error handling and response validation."""
+    """Generate a response using Gemini with enhanced error handling and response validation.
+    
+    The call is rate limited, retried with backoff on quota and server errors, and shared
+    with identical in-flight prompts by the scheduler in `gemini_client`.
+    """
     try:
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        response = model.generate_content(prompt)
-        
-        # Ensure response is not empty
-        if not response or not response.text:
-            raise Exception("Empty response received from Gemini")
-            
-        # Try to parse the response as JSON
-        try:
-            response_json = json.loads(response.text)
-            
-            # Validate required fields
-            required_fields = ["JD Match", "MissingKeywords", "Profile Summary"]
-            for field in required_fields:
-                if field not in response_json:
-                    raise ValueError(f"Missing required field: {field}")
-                    
-            return response.text
-            
-        except json.JSONDecodeError:
-            # If response is not valid JSON, try to extract JSON-like content
-            import re
-            json_pattern = r'\{.*\}'
-            match = re.search(json_pattern, response.text, re.DOTALL)
-            if match:
-                return match.group()
-            else:
-                raise Exception("Could not extract valid JSON response")
+        return validate_response(generate(prompt, MODEL_NAME))
                 
     except Exception as e:
         raise Exception(f"Error generating response: {str(e)}")
 
-def extract_pdf_text(uploaded_file):
-    """Extract text from PDF with enhanced error handling."""
+async def get_gemini_response_async(prompt, timeout=None):
+    """Async variant of get_gemini_response that does not block the event loop."""
     try:
-        reader = pdf.PdfReader(uploaded_file)
-        if len(reader.pages) == 0:
-            raise Exception("PDF file is empty")
+        response_text = await analyze(prompt, model_name=MODEL_NAME, timeout=timeout)
+        return validate_response(response_text)
+        
+    except Exception as e:
+        raise Exception(f"Error generating response: {str(e)}")
+
+def get_gemini_response_stream(prompt):
+    """Stream the Gemini response text chunk by chunk as it is generated."""
+    try:
+        yield from generate_stream(prompt, MODEL_NAME)
             
+    except Exception as e:
+        raise Exception(f"Error generating response: {str(e)}")
+
+def validate_response(response_text):
+    """Validate the model output and return it as canonical JSON text.
+    
+    Code fences, trailing commas and truncated output are repaired by `parse_analysis`
+    instead of failing the whole analysis.
+    """
+    result = parse_analysis(response_text, required_fields=["JD Match", "Profile Summary"])
+    return json.dumps(result.to_dict(), ensure_ascii=False)
+
+def add_missing_keywords(response_text, resume_text, job_description):
+    """Fill in "MissingKeywords" from the local keyword engine instead of the model."""
+    response_json = json.loads(response_text)
+    response_json["MissingKeywords"] = missing_keywords(resume_text, job_description)
+    return json.dumps(response_json, ensure_ascii=False)
+
+def _analysis_cache_key(resume_text, job_description):
+    return make_cache_key(
+        normalize_text(resume_text),
+        normalize_text(job_description),
+        PROMPT_VERSION,
+        MODEL_NAME
+    )
+
+def analyze_resume(resume_text, job_description):
+    """Analyze a resume against a job description, reusing cached responses for repeat pairs."""
+    cache_key = _analysis_cache_key(resume_text, job_description)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return cached
+        
+    response = get_gemini_response(prepare_prompt(resume_text, job_description))
+    response = add_missing_keywords(response, resume_text, job_description)
+    response_cache.set(cache_key, response)
+    return response
+
+async def analyze_resume_async(resume_text, job_description, timeout=None):
+    """Async variant of analyze_resume for batch jobs and the Telegram bot."""
+    cache_key = _analysis_cache_key(resume_text, job_description)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return cached
+        
+    response = await get_gemini_response_async(prepare_prompt(resume_text, job_description), timeout=timeout)
+    response = add_missing_keywords(response, resume_text, job_description)
+    response_cache.set(cache_key, response)
+    return response
+
+def analyze_resume_stream(resume_text, job_description):
+    """Stream an analysis chunk by chunk, caching the validated response once it completes."""
+    cache_key = _analysis_cache_key(resume_text, job_description)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        yield cached
+        return
+        
+    chunks = []
+    for chunk in get_gemini_response_stream(prepare_prompt(resume_text, job_description)):
+        chunks.append(chunk)
+        yield chunk
+        
+    response = validate_response("".join(chunks))
+    response = add_missing_keywords(response, resume_text, job_description)
+    response_cache.set(cache_key, response)
+
+def extract_pdf_text(uploaded_file, max_pages=None, max_chars=None, workers=None):
+    """Extract text from PDF with enhanced error handling.
+    
+    Pages are streamed from `iter_pdf_pages`, which caches page text by file hash and
+    stops once `max_pages` or `max_chars` is reached.
+    """
+    try:
         text = []
-        for page in reader.pages:
-            page_text = page.extract_text()
+        for page_text in iter_pdf_pages(uploaded_file, max_pages=max_pages, max_chars=max_chars, workers=workers):
             if page_text:
                 text.append(page_text)
                 
         if not text:
             raise Exception("No text could be extracted from the PDF")
             
-        return " ".join(text)
+        # Form feeds mark page breaks so prompt compaction can spot running headers and footers
+        return "\f".join(text)
         
     except Exception as e:
         raise Exception(f"Error extracting PDF text: {str(e)}")
@@ -98,7 +169,6 @@ def prepare_prompt(resume_text, job_description):
     Provide a response in the following JSON format ONLY:
     {{
         "JD Match": A percentage (0-100) indicating the overall alignment of the resume with the job description,
-        "MissingKeywords": List of specific skills, tools, or phrases missing in the resume but present in the job description,
         "Profile Summary": Detailed analysis of the match and specific improvement suggestions,
         "Improvements": {{
             "Skills": [List of skills to add or highlight],
@@ -106,8 +176,37 @@ def prepare_prompt(resume_text, job_description):
         "Cold Message": A persuasive, tailored message (50-100 words) highlighting key qualifications and enthusiasm for the role, designed to attract the recruiter or hiring manager
     }}
     """
-    # "detailed analysis of the match and specific improvement suggestions"  "professionally crafted cold message, between 50-100 words"
+    # Drop whitespace, boilerplate and repeated lines and keep each section within its token budget
+    resume_text, job_description = compact_prompt_sections(resume_text, job_description)
+    
+    return prompt_template.format(
+        resume_text=resume_text,
+        job_description=job_description
+    )
+
+
+def prepare_section_prompt(title, section_text, job_description):
+    """Prepare the prompt that evaluates one resume section against a job description (see `incremental`)."""
+    prompt_template = """
+    Act as an expert Applicant Tracking System (ATS) specialist. Evaluate ONE section of a resume against the job description.
+
+    Resume section ({title}):
+    {section_text}
+
+    Job Description:
+    {job_description}
+
+    Provide a response in the following JSON format ONLY:
+    {{
+        "Match": A percentage (0-100) indicating how well this section supports the job description,
+        "Summary": One or two sentences on what this section shows and what it lacks for this role,
+        "Improvements": {{
+            "Skills": [Skills this section should add or highlight]
+        }}
+    }}
+    """
     return prompt_template.format(
-        resume_text=resume_text.strip(),
-        job_description=job_description.strip()
-    )
\ No newline at end of file
+        title=title or "Header",
+        section_text=compact_section(section_text, SECTION_TOKEN_BUDGET),
+        job_description=compact_section(job_description, JD_TOKEN_BUDGET)
+    )
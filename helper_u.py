@@ -1,11 +1,25 @@
 import google.generativeai as genai
-import PyPDF2 as pdf
 import json
 import io
 from docx import Document
-from docx2pdf import convert
-import tempfile
+from docx.document import Document as DocumentType
 import os
+from artifact_store import get_artifact_store
+from cache import CACHE_DIR, TieredCache, make_cache_key, normalize_text
+from converters import get_converter
+from docx_sections import SectionIndex
+from gemini_client import analyze, generate, generate_stream
+from keywords import missing_keywords
+from pdf_extract import iter_pdf_pages
+from prompt_budget import JD_TOKEN_BUDGET, SECTION_TOKEN_BUDGET, compact_prompt_sections, compact_section
+from response_parser import parse_analysis
+
+MODEL_NAME = 'gemini-1.5-pro'
+# Bump whenever the prompt template changes so stale cached analyses are not reused
+PROMPT_VERSION = 'ats-improvements-v3'
+SECTION_PROMPT_VERSION = 'section-improvements-v2'
+
+response_cache = TieredCache(os.path.join(CACHE_DIR, "responses.sqlite3"))
 
 def configure_genai(api_key):
     """Configure the Generative AI API with error handling."""
@@ -16,65 +30,123 @@ def configure_genai(api_key):
     
 
 def get_gemini_response(prompt):
-    """Generate a response using Gemini with enhanced error handling and response validation."""
+    """Generate a response using Gemini with enhanced error handling and response validation.
+    
+    The call is rate limited, retried with backoff on quota and server errors, and shared
+    with identical in-flight prompts by the scheduler in `gemini_client`.
+    """
     try:
-        model = genai.GenerativeModel('gemini-1.5-pro')
-        response = model.generate_content(prompt)
-        
-        # Ensure response is not empty
-        if not response or not response.text:
-            raise Exception("Empty response received from Gemini")
-            
-        # Try to parse the response as JSON
-        try:
-            response_json = json.loads(response.text)
-            
-            # Validate required fields
-            required_fields = ["JD Match", "MissingKeywords", "Profile Summary", "Improvements"]
-            for field in required_fields:
-                if field not in response_json:
-                    raise ValueError(f"Missing required field: {field}")
-                    
-            return response.text
-            
-        except json.JSONDecodeError:
-            # If response is not valid JSON, try to extract JSON-like content
-            import re
-            json_pattern = r'\{.*\}'
-            match = re.search(json_pattern, response.text, re.DOTALL)
-            if match:
-                return match.group()
-            else:
-                raise Exception("Could not extract valid JSON response")
+        return validate_response(generate(prompt, MODEL_NAME))
                 
     except Exception as e:
         raise Exception(f"Error generating response: {str(e)}")
 
-def extract_pdf_text(uploaded_file):
-    """Extract text from PDF with enhanced error handling."""
+async def get_gemini_response_async(prompt, timeout=None):
+    """Async variant of get_gemini_response that does not block the event loop."""
+    try:
+        response_text = await analyze(prompt, model_name=MODEL_NAME, timeout=timeout)
+        return validate_response(response_text)
+        
+    except Exception as e:
+        raise Exception(f"Error generating response: {str(e)}")
+
+def get_gemini_response_stream(prompt):
+    """Stream the Gemini response text chunk by chunk as it is generated."""
     try:
-        reader = pdf.PdfReader(uploaded_file)
-        if len(reader.pages) == 0:
-            raise Exception("PDF file is empty")
+        yield from generate_stream(prompt, MODEL_NAME)
             
+    except Exception as e:
+        raise Exception(f"Error generating response: {str(e)}")
+
+def validate_response(response_text):
+    """Validate the model output and return it as canonical JSON text.
+    
+    Code fences, trailing commas and truncated output are repaired by `parse_analysis`
+    instead of failing the whole analysis.
+    """
+    result = parse_analysis(response_text, required_fields=["JD Match", "Profile Summary", "Improvements"])
+    return json.dumps(result.to_dict(), ensure_ascii=False)
+
+def add_missing_keywords(response_text, resume_text, job_description):
+    """Fill in "MissingKeywords" from the local keyword engine instead of the model."""
+    response_json = json.loads(response_text)
+    response_json["MissingKeywords"] = missing_keywords(resume_text, job_description)
+    return json.dumps(response_json, ensure_ascii=False)
+
+def _analysis_cache_key(resume_text, job_description):
+    return make_cache_key(
+        normalize_text(resume_text),
+        normalize_text(job_description),
+        PROMPT_VERSION,
+        MODEL_NAME
+    )
+
+def analyze_resume(resume_text, job_description):
+    """Analyze a resume against a job description, reusing cached responses for repeat pairs."""
+    cache_key = _analysis_cache_key(resume_text, job_description)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return cached
+        
+    response = get_gemini_response(prepare_prompt(resume_text, job_description))
+    response = add_missing_keywords(response, resume_text, job_description)
+    response_cache.set(cache_key, response)
+    return response
+
+async def analyze_resume_async(resume_text, job_description, timeout=None):
+    """Async variant of analyze_resume for batch jobs and the Telegram bot."""
+    cache_key = _analysis_cache_key(resume_text, job_description)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return cached
+        
+    response = await get_gemini_response_async(prepare_prompt(resume_text, job_description), timeout=timeout)
+    response = add_missing_keywords(response, resume_text, job_description)
+    response_cache.set(cache_key, response)
+    return response
+
+def analyze_resume_stream(resume_text, job_description):
+    """Stream an analysis chunk by chunk, caching the validated response once it completes."""
+    cache_key = _analysis_cache_key(resume_text, job_description)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        yield cached
+        return
+        
+    chunks = []
+    for chunk in get_gemini_response_stream(prepare_prompt(resume_text, job_description)):
+        chunks.append(chunk)
+        yield chunk
+        
+    response = validate_response("".join(chunks))
+    response = add_missing_keywords(response, resume_text, job_description)
+    response_cache.set(cache_key, response)
+
+def extract_pdf_text(uploaded_file, max_pages=None, max_chars=None, workers=None):
+    """Extract text from PDF with enhanced error handling.
+    
+    Pages are streamed from `iter_pdf_pages`, which caches page text by file hash and
+    stops once `max_pages` or `max_chars` is reached.
+    """
+    try:
         text = []
-        for page in reader.pages:
-            page_text = page.extract_text()
+        for page_text in iter_pdf_pages(uploaded_file, max_pages=max_pages, max_chars=max_chars, workers=workers):
             if page_text:
                 text.append(page_text)
                 
         if not text:
             raise Exception("No text could be extracted from the PDF")
             
-        return " ".join(text)
+        # Form feeds mark page breaks so prompt compaction can spot running headers and footers
+        return "\f".join(text)
         
     except Exception as e:
         raise Exception(f"Error extracting PDF text: {str(e)}")
     
 def extract_docx_text(docx_file):
-    """Extract text from Word document with error handling."""
+    """Extract text from Word document (a file-like object or a parsed Document) with error handling."""
     try:
-        doc = Document(docx_file)
+        doc = docx_file if isinstance(docx_file, DocumentType) else Document(docx_file)
         
         # Extract text from paragraphs
         text = []
@@ -92,7 +164,7 @@ def extract_docx_text(docx_file):
         if not text:
             raise Exception("No text could be extracted from the Word document")
             
-        return " ".join(text)
+        return "\n".join(text)
         
     except Exception as e:
         raise Exception(f"Error extracting Word document text: {str(e)}")
@@ -127,7 +199,6 @@ def prepare_prompt(resume_text, job_description):
     Provide a response in the following JSON format ONLY:
     {{
         "JD Match": A percentage (0-100) indicating the overall alignment of the resume with the job description,
-        "MissingKeywords": List of specific skills, tools, or phrases missing in the resume but present in the job description,
         "Profile Summary": Detailed analysis of the match and specific improvement suggestions,
         "Improvements": {{
             "Experience": [List of experience bullet points to add],
@@ -138,125 +209,94 @@ def prepare_prompt(resume_text, job_description):
     }}
     """
     
+    # Drop whitespace, boilerplate and repeated lines and keep each section within its token budget
+    resume_text, job_description = compact_prompt_sections(resume_text, job_description)
+    
+    return prompt_template.format(
+        resume_text=resume_text,
+        job_description=job_description
+    )
+
+
+def prepare_section_prompt(title, section_text, job_description):
+    """Prepare the prompt that evaluates one resume section against a job description (see `incremental`)."""
+    prompt_template = """
+    Act as an expert Applicant Tracking System (ATS) specialist. Evaluate ONE section of a resume against the job description.
+
+    Resume section ({title}):
+    {section_text}
+
+    Job Description:
+    {job_description}
+
+    Provide a response in the following JSON format ONLY:
+    {{
+        "Match": A percentage (0-100) indicating how well this section supports the job description,
+        "Summary": One or two sentences on what this section shows and what it lacks for this role,
+        "Improvements": {{
+            "Experience": [Bullet points that could be added to this section, if it describes experience],
+            "Skills": [Skills this section should add or highlight],
+            "Projects": [Project descriptions or achievements this section could add]
+        }}
+    }}
+    """
     return prompt_template.format(
-        resume_text=resume_text.strip(),
-        job_description=job_description.strip()
+        title=title or "Header",
+        section_text=compact_section(section_text, SECTION_TOKEN_BUDGET),
+        job_description=compact_section(job_description, JD_TOKEN_BUDGET)
     )
 
+def apply_improvements(doc, improvements):
+    """Add suggested improvements to a parsed Word document in place."""
+    if not improvements:
+        return doc
+        
+    # Index the sections once; each insert keeps the index current
+    sections = SectionIndex(doc)
+    
+    # Add experience improvements at the end of the experience section
+    for item in improvements.get("Experience", []):
+        sections.append_paragraph("Experience", "• " + item, style='List Bullet')
+    
+    # Combine skills into a single paragraph
+    if improvements.get("Skills"):
+        sections.append_paragraph("Skills", ", ".join(improvements["Skills"]))
+    
+    # Add project improvements at the end of the projects section
+    for item in improvements.get("Projects", []):
+        sections.append_paragraph("Projects", "• " + item, style='List Bullet')
+    
+    return doc
+
+def document_to_bytes(doc):
+    """Serialize a parsed Word document to DOCX bytes."""
+    output_bytes = io.BytesIO()
+    doc.save(output_bytes)
+    return output_bytes.getvalue()
+
 def update_word_document(docx_file, improvements):
-    """Update the Word document with suggested improvements."""
+    """Update the Word document (a file-like object or raw bytes) with suggested improvements."""
     try:
-        doc = Document(docx_file)
+        doc = Document(io.BytesIO(docx_file) if isinstance(docx_file, bytes) else docx_file)
         
         # Add improvements to the document
-        if improvements:
-            # Find sections in the document
-            experience_section = None
-            skills_section = None
-            projects_section = None
-            
-            # Search for section headings
-            for i, paragraph in enumerate(doc.paragraphs):
-                text = paragraph.text.lower()
-                if "experience" in text or "work" in text:
-                    experience_section = i
-                elif "skill" in text:
-                    skills_section = i
-                elif "project" in text:
-                    projects_section = i
-            
-            # Add experience improvements
-            if "Experience" in improvements and experience_section is not None:
-                # Find the next section after experience
-                next_section = len(doc.paragraphs)
-                for i in range(experience_section + 1, len(doc.paragraphs)):
-                    if doc.paragraphs[i].text.strip() and doc.paragraphs[i].style.name.startswith('Heading'):
-                        next_section = i
-                        break
-                
-                # Add improvements before the next section
-                for item in improvements["Experience"]:
-                    p = doc.add_paragraph("• " + item, style='List Bullet')
-                    # Move paragraph to the right position
-                    doc._body._body.insert(next_section, p._p)
-            
-            # Add skills improvements
-            if "Skills" in improvements and skills_section is not None:
-                # Find the next section after skills
-                next_section = len(doc.paragraphs)
-                for i in range(skills_section + 1, len(doc.paragraphs)):
-                    if doc.paragraphs[i].text.strip() and doc.paragraphs[i].style.name.startswith('Heading'):
-                        next_section = i
-                        break
-                
-                # Combine skills into a single paragraph
-                if improvements["Skills"]:
-                    skills_text = ", ".join(improvements["Skills"])
-                    p = doc.add_paragraph(skills_text)
-                    # Move paragraph to the right position
-                    doc._body._body.insert(next_section, p._p)
-            
-            # Add projects improvements
-            if "Projects" in improvements and projects_section is not None:
-                # Find the next section after projects
-                next_section = len(doc.paragraphs)
-                for i in range(projects_section + 1, len(doc.paragraphs)):
-                    if doc.paragraphs[i].text.strip() and doc.paragraphs[i].style.name.startswith('Heading'):
-                        next_section = i
-                        break
-                
-                # Add improvements before the next section
-                for item in improvements["Projects"]:
-                    p = doc.add_paragraph("• " + item, style='List Bullet')
-                    # Move paragraph to the right position
-                    doc._body._body.insert(next_section, p._p)
+        apply_improvements(doc, improvements)
         
         # Save the updated document
-        output_bytes = io.BytesIO()
-        doc.save(output_bytes)
-        output_bytes.seek(0)
-        
-        return output_bytes.getvalue()
+        return document_to_bytes(doc)
         
     except Exception as e:
         raise Exception(f"Error updating Word document: {str(e)}")
 
 def convert_docx_to_pdf(docx_bytes):
-    """Convert a Word document to PDF and save it to a specific location."""
+    """Convert a Word document to PDF in memory and keep a copy in the artifact store."""
     try:
-        # Create temporary files
-        with tempfile.NamedTemporaryFile(suffix='.docx', delete=False) as temp_docx:
-            temp_docx.write(docx_bytes.getvalue() if isinstance(docx_bytes, io.BytesIO) else docx_bytes)
-            temp_docx_path = temp_docx.name
-            
-        temp_pdf_path = temp_docx_path.replace('.docx', '.pdf')
-        
-        # Convert DOCX to PDF
-        convert(temp_docx_path, temp_pdf_path)
-        
-        # Read the resulting PDF
-        with open(temp_pdf_path, 'rb') as f:
-            pdf_bytes = f.read()
+        # Convert DOCX to PDF with the configured backend (warm LibreOffice pool on Linux)
+        converter = get_converter()
+        pdf_bytes = converter.convert(docx_bytes.getvalue() if isinstance(docx_bytes, io.BytesIO) else docx_bytes)
         
-        # Save the PDF to a specific location
-        output_dir = "saved_resumes"  # You can change this to your desired directory
-        os.makedirs(output_dir, exist_ok=True)  # Create the directory if it doesn't exist
-        
-        # Generate a unique filename using timestamp
-        import datetime
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_filename = f"resume_{timestamp}.pdf"
-        output_path = os.path.join(output_dir, output_filename)
-        
-        # Save the PDF
-        with open(output_path, 'wb') as f:
-            f.write(pdf_bytes)
-        
-        print(f"PDF saved to: {os.path.abspath(output_path)}")
-            
-        # Clean up temporary files
-        os.remove(temp_docx_path)
-        os.remove(temp_pdf_path)
+        # Optional persistence under a content-hash filename (safe for concurrent users)
+        get_artifact_store().put(pdf_bytes, suffix=".pdf")
         
         return pdf_bytes
         
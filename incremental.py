@@ -0,0 +1,188 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from cache import CACHE_DIR, TieredCache, make_cache_key, normalize_text
+from docx_sections import text_sections
+from gemini_client import generate
+from keywords import extract_skills, get_matcher, missing_keywords, tokenize_keywords
+from response_parser import extract_json_object, loads_lenient, parse_percentage, strip_code_fences
+
+# Above this share of changed words the resume needs a full analysis again
+MAX_CHANGED_FRACTION = 0.5
+SECTION_WORKERS = 8
+
+section_cache = TieredCache(os.path.join(CACHE_DIR, "sections.sqlite3"))
+
+
+def resume_sections(resume_text):
+    """Split resume text into sections, each with a hash of its normalized content."""
+    return [
+        {
+            "title": title,
+            "text": body,
+            "hash": make_cache_key(normalize_text(title), normalize_text(body)),
+            "words": len(body.split()),
+        }
+        for title, body in text_sections(resume_text)
+    ]
+
+
+def analyze_section(section, job_description, analyzer):
+    """Return the findings for one section against a job description, asking the model only on a cache miss.
+
+    `analyzer` is the helper module of the calling app (`helper` or `helper_u`), which
+    provides the model and the section prompt, so findings match its full analysis.
+    """
+    cache_key = make_cache_key(
+        section["hash"], normalize_text(job_description), analyzer.SECTION_PROMPT_VERSION, analyzer.MODEL_NAME
+    )
+    cached = section_cache.get(cache_key)
+    if cached is not None:
+        return json.loads(cached)
+
+    try:
+        prompt = analyzer.prepare_section_prompt(section["title"], section["text"], job_description)
+        response_text = generate(prompt, analyzer.MODEL_NAME)
+        data = loads_lenient(extract_json_object(strip_code_fences(response_text)) or "{}")
+    except Exception as e:
+        raise Exception(f"Error analyzing the {section['title'] or 'header'} section: {str(e)}")
+
+    improvements = data.get("Improvements") or {}
+    if not isinstance(improvements, dict):
+        improvements = {"Skills": improvements}
+    findings = {
+        "match": parse_percentage(data.get("Match")) or 0,
+        "summary": str(data.get("Summary") or ""),
+        "improvements": {
+            str(category): [str(item) for item in items if item] if isinstance(items, list) else [str(items)]
+            for category, items in improvements.items() if items
+        },
+    }
+    section_cache.set(cache_key, json.dumps(findings, ensure_ascii=False))
+    return findings
+
+
+def section_findings(sections, job_description, analyzer):
+    """Return findings for every section, calling the model concurrently for uncached ones."""
+    if not sections:
+        return []
+    with ThreadPoolExecutor(max_workers=min(SECTION_WORKERS, len(sections))) as pool:
+        return list(pool.map(lambda section: analyze_section(section, job_description, analyzer), sections))
+
+
+def make_base(resume_text, job_description, analysis):
+    """Return the state a later `reanalyze` compares against: a full analysis and the sections it saw."""
+    return {
+        "jd": make_cache_key(normalize_text(job_description)),
+        "analysis": analysis,
+        "sections": resume_sections(resume_text),
+    }
+
+
+def changed_sections(base, sections):
+    """Return (changed or added sections, removed base sections).
+
+    Sections are compared by hash; a base section only counts as removed when no section
+    with its title is left, otherwise it was edited and shows up as changed.
+    """
+    base_hashes = {section["hash"] for section in base["sections"]}
+    hashes = {section["hash"] for section in sections}
+    titles = {normalize_text(section["title"]).lower() for section in sections}
+    return (
+        [section for section in sections if section["hash"] not in base_hashes],
+        [
+            section for section in base["sections"]
+            if section["hash"] not in hashes and normalize_text(section["title"]).lower() not in titles
+        ],
+    )
+
+
+def can_reanalyze(base, resume_text, job_description):
+    """Return True when `reanalyze` may replace a full analysis: same JD and a small enough edit."""
+    if not base or base["jd"] != make_cache_key(normalize_text(job_description)):
+        return False
+    sections = resume_sections(resume_text)
+    changed, removed = changed_sections(base, sections)
+    changed_words = sum(section["words"] for section in changed + removed)
+    total_words = max(sum(section["words"] for section in sections), sum(s["words"] for s in base["sections"]), 1)
+    return changed_words / total_words <= MAX_CHANGED_FRACTION
+
+
+def mentions_skill(resume_skills, resume_tokens, skill):
+    """Return True if a resume mentions a suggested skill.
+
+    Skills in the lexicon are compared by canonical name (so "k8s" covers "Kubernetes"),
+    anything else by whole tokens, so "Go" is not found inside "Google".
+    `resume_skills` and `resume_tokens` come from `KeywordMatcher.find` and `tokenize_keywords`.
+    """
+    canonical = extract_skills(skill)
+    if canonical:
+        return all(name in resume_skills for name in canonical)
+    tokens = tokenize_keywords(skill)
+    return bool(tokens) and any(
+        resume_tokens[i:i + len(tokens)] == tokens for i in range(len(resume_tokens) - len(tokens) + 1)
+    )
+
+
+def _weight(section):
+    return max(section["words"], 1)
+
+
+def reanalyze(base, resume_text, job_description, analyzer):
+    """Update a full analysis for an edited resume, asking the model only about the sections that differ.
+
+    Only the changed or added sections and the base sections they replace or remove go to
+    the model (through `analyzer`, see `analyze_section`); unchanged sections keep their
+    share of the full analysis. The result keeps the response schema: "JD Match" is the
+    base score with the old sections' word-weighted share swapped for the new ones', the
+    changed sections' findings are appended to the "Profile Summary", their suggestions
+    are merged into "Improvements" (dropping skills the resume now mentions), and
+    "MissingKeywords" is recomputed locally. Returns (analysis, stats); a failed section
+    call raises, so the caller can fall back to a full analysis.
+    """
+    sections = resume_sections(resume_text)
+    changed, removed = changed_sections(base, sections)
+    hashes = {section["hash"] for section in sections}
+    replaced = [section for section in base["sections"] if section["hash"] not in hashes]
+    analysis = dict(base["analysis"])
+    stats = {
+        "changed_sections": [section["title"] or "Header" for section in changed],
+        "reused_sections": len(sections) - len(changed),
+    }
+
+    needed = list({section["hash"]: section for section in changed + replaced}.values())
+    findings = section_findings(needed, job_description, analyzer)
+    findings_by_hash = dict(zip((section["hash"] for section in needed), findings))
+
+    base_match = parse_percentage(analysis.get("JD Match"))
+    if base_match is not None:
+        weighted = base_match * sum(_weight(section) for section in base["sections"])
+        weighted -= sum(_weight(section) * findings_by_hash[section["hash"]]["match"] for section in replaced)
+        weighted += sum(_weight(section) * findings_by_hash[section["hash"]]["match"] for section in changed)
+        total = max(sum(_weight(section) for section in sections), 1)
+        analysis["JD Match"] = f"{round(min(100, max(0, weighted / total)))}%"
+
+    notes = [f"- {section['title'] or 'Header'}: {findings_by_hash[section['hash']]['summary']}" for section in changed]
+    notes += [f"- {section['title'] or 'Header'}: removed" for section in removed]
+    if notes:
+        analysis["Profile Summary"] = (
+            f"{analysis.get('Profile Summary') or ''}\n\nChanges since the last full analysis:\n" + "\n".join(notes)
+        ).strip()
+
+    improvements = {category: list(items) for category, items in (analysis.get("Improvements") or {}).items()}
+    for section in changed:
+        for category, items in findings_by_hash[section["hash"]]["improvements"].items():
+            existing = improvements.setdefault(category, [])
+            seen = {item.lower() for item in existing}
+            existing.extend(item for item in items if item.lower() not in seen)
+    # Suggested skills the edited resume now mentions are done
+    if "Skills" in improvements:
+        resume_skills = get_matcher().find(resume_text)
+        resume_tokens = tokenize_keywords(resume_text)
+        improvements["Skills"] = [
+            skill for skill in improvements["Skills"] if not mentions_skill(resume_skills, resume_tokens, skill)
+        ]
+    analysis["Improvements"] = improvements
+
+    analysis["MissingKeywords"] = missing_keywords(resume_text, job_description)
+    return analysis, stats
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from cache import CACHE_DIR, normalize_text
+from keywords import extract_skills
+from prescore import tokenize
+
+# Bump whenever the precomputed features change so stored JDs are re-derived on access
+FEATURES_VERSION = 6
+
+
+def make_jd_id(job_description):
+    """Return the stable ID of a job description, derived from its normalized text."""
+    return hashlib.sha256(normalize_text(job_description).encode("utf-8")).hexdigest()[:16]
+
+
+def build_features(job_description):
+    """Precompute everything later analyses need from a job description."""
+    tokens = tokenize(job_description)
+    term_counts = Counter(tokens)
+    return {
+        "version": FEATURES_VERSION,
+        "term_counts": dict(term_counts),
+        "keywords": [term for term, _ in term_counts.most_common(50)],
+        "skills": extract_skills(job_description),
+        "token_count": len(tokens),
+    }
+
+
+class JDStore:
+    """SQLite store of job descriptions and their precomputed features, addressed by ID."""
+
+    def __init__(self, path=os.path.join(CACHE_DIR, "job_descriptions.sqlite3")):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS job_descriptions ("
+            "id TEXT PRIMARY KEY, title TEXT NOT NULL, text TEXT NOT NULL, "
+            "features TEXT NOT NULL, created_at REAL NOT NULL, used_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def add(self, job_description, title=None):
+        """Store a job description (if new) and return its record."""
+        if not job_description or not job_description.strip():
+            raise ValueError("Job description cannot be empty")
+
+        jd_id = make_jd_id(job_description)
+        record = self.get(jd_id)
+        if record is not None:
+            return record
+
+        if not title:
+            first_line = next((line.strip() for line in job_description.splitlines() if line.strip()), "")
+            title = first_line[:80]
+        now = time.time()
+        features = build_features(job_description)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO job_descriptions (id, title, text, features, created_at, used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (jd_id, title, job_description, json.dumps(features), now, now),
+            )
+            self._conn.commit()
+        return self._record(jd_id, title, job_description, features, now)
+
+    def get(self, jd_id):
+        """Return the record for jd_id, or None if it is not stored."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT title, text, features, created_at FROM job_descriptions WHERE id = ?", (jd_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            title, text, features, created_at = row
+            features = json.loads(features)
+            if features.get("version") != FEATURES_VERSION:
+                features = build_features(text)
+                self._conn.execute(
+                    "UPDATE job_descriptions SET features = ? WHERE id = ?", (json.dumps(features), jd_id)
+                )
+            self._conn.execute("UPDATE job_descriptions SET used_at = ? WHERE id = ?", (time.time(), jd_id))
+            self._conn.commit()
+        return self._record(jd_id, title, text, features, created_at)
+
+    def list(self, limit=100):
+        """Return (id, title) pairs for stored job descriptions, most recently used first."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, title FROM job_descriptions ORDER BY used_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+
+    def delete(self, jd_id):
+        """Remove a stored job description."""
+        with self._lock:
+            self._conn.execute("DELETE FROM job_descriptions WHERE id = ?", (jd_id,))
+            self._conn.commit()
+
+    @staticmethod
+    def _record(jd_id, title, text, features, created_at):
+        return {"id": jd_id, "title": title, "text": text, "created_at": created_at, **features}
+
+
+_default_store = None
+
+
+def get_jd_store():
+    """Return the process-wide JDStore."""
+    global _default_store
+    if _default_store is None:
+        _default_store = JDStore()
+    return _default_store
@@ -0,0 +1,365 @@
+# python jobs.py --workers 4
+
+import argparse
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+from dotenv import load_dotenv
+import helper
+import helper_u
+from cache import CACHE_DIR, make_cache_key
+
+JOBS_PATH = os.path.join(CACHE_DIR, "jobs.sqlite3")
+# Jobs of each kind allowed to run at once across all workers
+CONCURRENCY_LIMITS = {
+    "analyze": int(os.getenv("RESUMEAI_JOB_ANALYZE_LIMIT", "4")),
+    "tailor": int(os.getenv("RESUMEAI_JOB_TAILOR_LIMIT", "2")),
+    "convert": int(os.getenv("RESUMEAI_JOB_CONVERT_LIMIT", "2")),
+}
+HEARTBEAT_SECONDS = 10
+# A running job whose worker has not renewed its lease (on every heartbeat) for this many
+# seconds is assumed lost and run again
+LEASE_SECONDS = 6 * HEARTBEAT_SECONDS
+RETRY_BASE_SECONDS = 5
+# Finished jobs are kept this long so repeat submissions are answered from the queue
+RETENTION_SECONDS = 7 * 24 * 3600
+
+
+def job_analyzer(kind, payload):
+    """Return the helper module whose model and prompt produce a job's result (None for conversions)."""
+    if kind == "analyze":
+        return helper_u if payload.get("improvements") else helper
+    if kind == "tailor":
+        return helper_u
+    return None
+
+
+def make_job_id(kind, payload, data=None):
+    """Return the content-hash ID of a job, so identical requests share one job.
+
+    Like the analysis cache key, it includes the model and prompt version, so a finished
+    job from before a model or prompt change is not handed out again.
+    """
+    data_hash = hashlib.sha256(data).hexdigest() if data else ""
+    analyzer = job_analyzer(kind, payload)
+    version = (analyzer.MODEL_NAME, analyzer.PROMPT_VERSION) if analyzer else ()
+    return make_cache_key(kind, json.dumps(payload, sort_keys=True), data_hash, *version)[:32]
+
+
+class JobQueue:
+    """SQLite-backed job queue shared by the UI, the API and worker processes.
+
+    Jobs are deduplicated by content hash, claimed atomically under per-kind
+    concurrency limits, retried with exponential backoff and kept with their
+    results until they expire.
+    """
+
+    def __init__(self, path=JOBS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Autocommit mode so claims can take the write lock with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL, data BLOB, "
+            "status TEXT NOT NULL, attempts INTEGER NOT NULL, max_attempts INTEGER NOT NULL, "
+            "result TEXT, output BLOB, error TEXT, worker TEXT, "
+            "created_at REAL NOT NULL, available_at REAL NOT NULL, started_at REAL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, available_at)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS workers (id TEXT PRIMARY KEY, heartbeat_at REAL NOT NULL)"
+        )
+
+    def submit(self, kind, payload, data=None, max_attempts=3):
+        """Queue a job (or find the identical one already queued or finished) and return its ID."""
+        if kind not in CONCURRENCY_LIMITS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = make_job_id(kind, payload, data)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO jobs (id, kind, payload, data, status, attempts, max_attempts, "
+                "created_at, available_at, updated_at) VALUES (?, ?, ?, ?, 'queued', 0, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), data, max_attempts, now, now, now),
+            )
+            # Submitting a failed or cancelled job again gives it a fresh set of attempts
+            self._conn.execute(
+                "UPDATE jobs SET status = 'queued', attempts = 0, error = NULL, available_at = ?, updated_at = ? "
+                "WHERE id = ? AND status IN ('failed', 'cancelled')",
+                (now, now, job_id),
+            )
+        return job_id
+
+    def get(self, job_id):
+        """Return the status of a job (and its JSON result once done), or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT kind, status, attempts, max_attempts, result, error, output IS NOT NULL, "
+                "created_at, updated_at FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        kind, status, attempts, max_attempts, result, error, has_output, created_at, updated_at = row
+        return {
+            "id": job_id,
+            "kind": kind,
+            "status": status,
+            "attempts": attempts,
+            "max_attempts": max_attempts,
+            "result": json.loads(result) if result is not None else None,
+            "has_output": bool(has_output),
+            "error": error,
+            "created_at": created_at,
+            "updated_at": updated_at,
+        }
+
+    def output(self, job_id):
+        """Return the binary output of a finished job (a DOCX or PDF), or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT output FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row[0] if row else None
+
+    def wait(self, job_id, timeout=None, poll_interval=0.5, on_status=None):
+        """Poll until a job is done, failed or cancelled and return its status (None on timeout)."""
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            job = self.get(job_id)
+            if job is None or job["status"] in ("done", "failed", "cancelled"):
+                return job
+            if on_status:
+                on_status(job)
+            if deadline is not None and time.time() >= deadline:
+                return None
+            time.sleep(poll_interval)
+
+    def claim(self, worker_id):
+        """Atomically take the oldest runnable job whose kind is under its concurrency limit.
+
+        `started_at` doubles as the lease: the claiming worker renews it on every heartbeat,
+        and a running job whose lease is older than LEASE_SECONDS can be claimed again.
+        """
+        now = time.time()
+        lease_cutoff = now - LEASE_SECONDS
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Lost jobs that already used every attempt are not picked up again
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = 'Worker stopped before finishing', updated_at = ? "
+                    "WHERE status = 'running' AND started_at < ? AND attempts >= max_attempts",
+                    (now, lease_cutoff),
+                )
+                running = dict(self._conn.execute(
+                    "SELECT kind, COUNT(*) FROM jobs WHERE status = 'running' AND started_at >= ? GROUP BY kind",
+                    (lease_cutoff,),
+                ).fetchall())
+                open_kinds = [kind for kind, limit in CONCURRENCY_LIMITS.items() if running.get(kind, 0) < limit]
+                row = None
+                if open_kinds:
+                    placeholders = ", ".join("?" for _ in open_kinds)
+                    row = self._conn.execute(
+                        "SELECT id, kind, payload, data FROM jobs "
+                        f"WHERE kind IN ({placeholders}) AND ("
+                        "(status = 'queued' AND available_at <= ?) OR (status = 'running' AND started_at < ?)"
+                        ") ORDER BY created_at LIMIT 1",
+                        (*open_kinds, now, lease_cutoff),
+                    ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'running', attempts = attempts + 1, worker = ?, "
+                        "started_at = ?, updated_at = ? WHERE id = ?",
+                        (worker_id, now, now, row[0]),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        job_id, kind, payload, data = row
+        return {"id": job_id, "kind": kind, "payload": json.loads(payload), "data": data}
+
+    def complete(self, job_id, worker_id, result=None, output=None):
+        """Store a job's JSON result and/or binary output and mark it done.
+
+        Only the worker holding the job's lease may complete it; returns False if the job
+        was claimed by another worker in the meantime.
+        """
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, output = ?, error = NULL, data = NULL, "
+                "updated_at = ? WHERE id = ? AND status = 'running' AND worker = ?",
+                (json.dumps(result) if result is not None else None, output, time.time(), job_id, worker_id),
+            ).rowcount == 1
+
+    def fail(self, job_id, worker_id, error):
+        """Record a failed attempt, scheduling a retry with backoff until attempts run out.
+
+        Like `complete`, this only applies while worker_id holds the job's lease.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND status = 'running' AND worker = ?",
+                (job_id, worker_id),
+            ).fetchone()
+            if row is None:
+                return False
+            attempts, max_attempts = row
+            if attempts >= max_attempts:
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, updated_at = ? WHERE id = ?",
+                    (error, now, job_id),
+                )
+            else:
+                retry_at = now + RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'queued', error = ?, available_at = ?, updated_at = ? WHERE id = ?",
+                    (error, retry_at, now, job_id),
+                )
+            return True
+
+    def cancel(self, job_id):
+        """Withdraw a job that is not finished, e.g. because its caller stopped waiting and ran it itself.
+
+        A queued job is never claimed; a running one can no longer be completed or retried,
+        so its worker's result is dropped. Returns True if the job was withdrawn.
+        """
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE jobs SET status = 'cancelled', updated_at = ? WHERE id = ? AND status IN ('queued', 'running')",
+                (time.time(), job_id),
+            ).rowcount == 1
+
+    def heartbeat(self, worker_id):
+        """Report the worker as alive and renew the lease of the job it is running."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO workers (id, heartbeat_at) VALUES (?, ?)", (worker_id, now)
+            )
+            self._conn.execute(
+                "UPDATE jobs SET started_at = ? WHERE status = 'running' AND worker = ?", (now, worker_id)
+            )
+
+    def workers_alive(self):
+        """Return the number of workers that reported in recently."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM workers WHERE heartbeat_at >= ?", (time.time() - 3 * HEARTBEAT_SECONDS,)
+            ).fetchone()[0]
+
+    def purge(self, older_than=RETENTION_SECONDS):
+        """Delete finished jobs and silent workers older than older_than seconds."""
+        cutoff = time.time() - older_than
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed', 'cancelled') AND updated_at < ?", (cutoff,)
+            )
+            self._conn.execute("DELETE FROM workers WHERE heartbeat_at < ?", (cutoff,))
+
+
+_default_queue = None
+
+
+def get_job_queue():
+    """Return the process-wide JobQueue."""
+    global _default_queue
+    if _default_queue is None:
+        _default_queue = JobQueue()
+    return _default_queue
+
+
+def run_analyze(payload, data):
+    module = job_analyzer("analyze", payload)
+    return json.loads(module.analyze_resume(payload["resume_text"], payload["job_description"])), None
+
+
+def run_tailor(payload, data):
+    resume_text = helper_u.extract_docx_text(io.BytesIO(data))
+    analysis = json.loads(helper_u.analyze_resume(resume_text, payload["job_description"]))
+    output = helper_u.update_word_document(data, analysis.get("Improvements", {}))
+    if payload.get("output_format", "pdf") == "pdf":
+        output = helper_u.convert_docx_to_pdf(output)
+    return analysis, output
+
+
+def run_convert(payload, data):
+    return None, helper_u.convert_docx_to_pdf(data)
+
+
+HANDLERS = {
+    "analyze": run_analyze,
+    "tailor": run_tailor,
+    "convert": run_convert,
+}
+
+
+def run_worker(path=JOBS_PATH, poll_interval=1.0):
+    """Claim and run jobs until the process is stopped."""
+    load_dotenv()
+    api_key = os.getenv("GEMINI_API_KEY")
+    if api_key:
+        helper.configure_genai(api_key)
+
+    queue = JobQueue(path)
+    worker_id = f"{socket.gethostname()}-{os.getpid()}"
+
+    # Report in from a thread so long jobs do not make the worker look dead
+    def heartbeat():
+        while True:
+            queue.heartbeat(worker_id)
+            time.sleep(HEARTBEAT_SECONDS)
+
+    threading.Thread(target=heartbeat, daemon=True).start()
+    last_purge = 0.0
+    while True:
+        job = queue.claim(worker_id)
+        if job is None:
+            if time.time() - last_purge > 3600:
+                queue.purge()
+                last_purge = time.time()
+            time.sleep(poll_interval)
+            continue
+        try:
+            result, output = HANDLERS[job["kind"]](job["payload"], job["data"])
+            queue.complete(job["id"], worker_id, result=result, output=output)
+        except Exception as e:
+            queue.fail(job["id"], worker_id, str(e))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run background workers for queued analysis, tailoring and conversion jobs.")
+    parser.add_argument("--workers", type=int, default=2, help="Worker processes to start")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds between polls when the queue is empty")
+    args = parser.parse_args()
+
+    processes = [
+        multiprocessing.Process(target=run_worker, kwargs={"poll_interval": args.poll_interval}, daemon=True)
+        for _ in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+    print(f"Started {len(processes)} job workers")
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+import re
+from collections import deque
+
+# Keeps tokens such as "c++", "c#", "node.js" and ".net" intact; "/" and "-" split tokens,
+# so "CI/CD", "ci-cd" and "ci cd" all match the same alias
+KEYWORD_TOKEN_PATTERN = re.compile(r"\.?[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9]+)*[+#]*")
+
+# Canonical skill name -> aliases (the canonical name is an alias of itself unless it is
+# listed in AMBIGUOUS_NAMES). Ambiguous aliases such as "CV" or "rest" are left out.
+SKILL_LEXICON = {
+    # Languages
+    "Python": ["python3"],
+    "Java": [],
+    "JavaScript": ["js", "ecmascript", "es6"],
+    "TypeScript": [],
+    "C++": ["cpp"],
+    "C#": ["c sharp", "csharp"],
+    "Go": ["golang"],
+    "Rust": [],
+    "Ruby": [],
+    "PHP": [],
+    "Scala": [],
+    "Kotlin": [],
+    "Swift": [],
+    "R": ["r programming", "rstudio"],
+    "MATLAB": [],
+    "SAS": [],
+    "Bash": ["shell scripting", "shell script"],
+    "PowerShell": [],
+    "SQL": [],
+    "PL/SQL": ["plsql"],
+    "T-SQL": ["tsql", "transact sql"],
+    "NoSQL": ["no sql"],
+    "HTML": ["html5"],
+    "CSS": ["css3"],
+    "VBA": [],
+    # Data and analytics
+    "Pandas": [],
+    "NumPy": [],
+    "SciPy": [],
+    "Scikit-learn": ["sklearn", "scikit learn"],
+    "TensorFlow": ["tensor flow"],
+    "PyTorch": ["torch"],
+    "Keras": [],
+    "XGBoost": [],
+    "LightGBM": [],
+    "Hugging Face": ["huggingface"],
+    "LangChain": [],
+    "OpenCV": [],
+    "spaCy": [],
+    "NLTK": [],
+    "Matplotlib": [],
+    "Seaborn": [],
+    "Plotly": [],
+    "Jupyter": ["jupyter notebook", "jupyterlab"],
+    "Machine Learning": ["ml"],
+    "Deep Learning": [],
+    "Natural Language Processing": ["nlp"],
+    "Computer Vision": [],
+    "Large Language Models": ["llm", "llms", "large language model"],
+    "Generative AI": ["genai", "gen ai"],
+    "Artificial Intelligence": [],
+    "Statistics": ["statistical analysis", "statistical modeling"],
+    "A/B Testing": ["ab testing", "a/b tests", "split testing"],
+    "Data Visualization": ["data viz"],
+    "Data Modeling": ["data modelling"],
+    "Data Warehousing": ["data warehouse", "dwh"],
+    "ETL": ["extract transform load"],
+    "Data Pipelines": ["data pipeline"],
+    "Feature Engineering": [],
+    "Time Series": ["time series analysis"],
+    "Power BI": ["powerbi", "power bi desktop"],
+    "Tableau": [],
+    "Looker": [],
+    "Excel": ["ms excel", "ms-excel", "microsoft excel", "advanced excel", "excel vba", "pivot tables"],
+    "Google Analytics": [],
+    # Big data
+    "Apache Spark": ["pyspark", "spark sql"],
+    "Hadoop": ["hdfs", "mapreduce"],
+    "Hive": ["apache hive"],
+    "Apache Kafka": ["kafka"],
+    "Apache Airflow": ["airflow"],
+    "Apache Flink": ["flink"],
+    "Apache Beam": [],
+    "Databricks": [],
+    "Snowflake": [],
+    "dbt": ["data build tool"],
+    "BigQuery": ["big query", "google bigquery"],
+    "Amazon Redshift": ["redshift"],
+    "Delta Lake": [],
+    # Databases
+    "MySQL": [],
+    "PostgreSQL": ["postgres", "postgre sql"],
+    "SQL Server": ["mssql", "ms sql", "microsoft sql server"],
+    "Oracle Database": ["oracle db"],
+    "SQLite": [],
+    "MongoDB": ["mongo"],
+    "Cassandra": ["apache cassandra"],
+    "Redis": [],
+    "Elasticsearch": ["elastic search", "elk"],
+    "DynamoDB": ["dynamo db"],
+    "Neo4j": [],
+    # Cloud and infrastructure
+    "AWS": ["amazon web services"],
+    "Azure": ["microsoft azure"],
+    "Google Cloud": ["gcp", "google cloud platform"],
+    "AWS Lambda": [],
+    "Amazon S3": ["s3"],
+    "Amazon EC2": ["ec2"],
+    "Azure Data Factory": ["adf"],
+    "Docker": [],
+    "Kubernetes": ["k8s", "kubectl"],
+    "Helm": [],
+    "Terraform": [],
+    "Ansible": [],
+    "CloudFormation": ["cloud formation"],
+    "Linux": [],
+    "Nginx": [],
+    "Serverless": [],
+    "Microservices": ["microservice", "micro services"],
+    # DevOps and tooling
+    "Git": [],
+    "GitHub": [],
+    "GitLab": [],
+    "Bitbucket": [],
+    "CI/CD": ["cicd", "continuous integration", "continuous delivery", "continuous deployment"],
+    "Jenkins": [],
+    "GitHub Actions": [],
+    "Prometheus": [],
+    "Grafana": [],
+    "Jira": [],
+    "Confluence": [],
+    "MLOps": ["ml ops"],
+    "MLflow": ["ml flow"],
+    # Web and backend
+    "React": ["react.js", "reactjs"],
+    "Angular": ["angularjs", "angular.js"],
+    "Vue.js": ["vue", "vuejs"],
+    "Next.js": ["nextjs"],
+    "Node.js": ["nodejs"],
+    "Express.js": ["expressjs"],
+    "Django": [],
+    "Flask": [],
+    "FastAPI": ["fast api"],
+    "Spring Boot": ["springboot", "spring framework"],
+    ".NET": ["dotnet", "asp.net", ".net core"],
+    "GraphQL": [],
+    "REST APIs": ["restful", "rest api", "restful apis", "restful api"],
+    "gRPC": [],
+    "Streamlit": [],
+    # Practices
+    "Agile": [],
+    "Unit Testing": ["unit tests"],
+    "Test-Driven Development": ["tdd"],
+    "Object-Oriented Programming": ["oop", "object oriented programming"],
+    "Data Structures": ["data structures and algorithms", "dsa"],
+    "System Design": [],
+    "Distributed Systems": [],
+}
+
+# Names that are ordinary words or single letters; these only match through their aliases
+# (or through CAPITALIZED_NAMES and CONTEXT_PATTERNS)
+AMBIGUOUS_NAMES = frozenset({"Go", "R", "Excel", "React", "Swift", "Helm", "Hive"})
+
+# Single words that are skills only when written as a capitalized (or upper-case) standalone
+# token, so "Excel" and "React" count but "excel at" and "react to incidents" do not
+CAPITALIZED_NAMES = {
+    "Excel": "Excel",
+    "React": "React",
+    "Swift": "Swift",
+    "Helm": "Helm",
+    "Hive": "Hive",
+    "Spark": "Apache Spark",
+    "AI": "Artificial Intelligence",
+    "Node": "Node.js",
+    "Lambda": "AWS Lambda",
+    "Oracle": "Oracle Database",
+}
+
+# Names too short even for CAPITALIZED_NAMES; they count only as an item of a list, e.g.
+# "Python, R, SQL", "Python and R" or "Languages: R" (but not "R&D" or "Plan R")
+CONTEXT_PATTERNS = {
+    "R": re.compile(
+        r"(?:^|[,;:|/(•]|\band|\bor)[ \t]*\b(R)\b(?![&'’])(?=[ \t]*(?:[,;|/)]|\.?[ \t]*$|\.\s|and\b|or\b))",
+        re.MULTILINE
+    ),
+}
+
+
+_CASED_TOKEN_PATTERN = re.compile(KEYWORD_TOKEN_PATTERN.pattern, re.IGNORECASE)
+
+
+def tokenize_keywords(text):
+    """Lowercase text and split it into the tokens used for lexicon matching."""
+    return KEYWORD_TOKEN_PATTERN.findall((text or "").lower())
+
+
+class KeywordMatcher:
+    """Token-level Aho-Corasick automaton that finds lexicon skills and normalizes aliases."""
+
+    def __init__(self, lexicon=None):
+        lexicon = SKILL_LEXICON if lexicon is None else lexicon
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+
+        for canonical, aliases in lexicon.items():
+            names = set(aliases) if canonical in AMBIGUOUS_NAMES else {canonical, *aliases}
+            for alias in names:
+                tokens = tokenize_keywords(alias)
+                if not tokens:
+                    continue
+                node = 0
+                for token in tokens:
+                    next_node = self._goto[node].get(token)
+                    if next_node is None:
+                        next_node = len(self._goto)
+                        self._goto[node][token] = next_node
+                        self._goto.append({})
+                        self._fail.append(0)
+                        self._output.append([])
+                    node = next_node
+                # Outputs remember the alias length so matches inside a longer one can be dropped
+                if (canonical, len(tokens)) not in self._output[node]:
+                    self._output[node].append((canonical, len(tokens)))
+
+        # Breadth-first pass to link every state to its longest proper suffix state
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for token, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(token, 0)
+                for output in self._output[self._fail[child]]:
+                    if output not in self._output[child]:
+                        self._output[child].append(output)
+
+    def find(self, text):
+        """Return {canonical skill: count} for text, in order of first occurrence.
+
+        A match that lies inside a longer one is not counted, so "PL/SQL" does not also
+        report "SQL" and "Apache Hive" counts "Hive" once.
+        """
+        text = text or ""
+        matches = []
+        spans = []
+        state = 0
+        for match in _CASED_TOKEN_PATTERN.finditer(text):
+            cased_token = match.group()
+            spans.append(match.span())
+            token = cased_token.lower()
+            while state and token not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(token, 0)
+            for canonical, length in self._output[state]:
+                matches.append((spans[-length][0], match.end(), canonical))
+            canonical = CAPITALIZED_NAMES.get(cased_token) or (
+                cased_token.isupper() and CAPITALIZED_NAMES.get(cased_token.capitalize())
+            )
+            if canonical:
+                matches.append((match.start(), match.end(), canonical))
+        for canonical, pattern in CONTEXT_PATTERNS.items():
+            matches.extend((match.start(1), match.end(1), canonical) for match in pattern.finditer(text))
+
+        found = {}
+        kept_start, kept_end = -1, -1
+        # Longest first at each start, so a contained match always comes after its container
+        for start, end, canonical in sorted(matches, key=lambda m: (m[0], -m[1])):
+            if end <= kept_end and (start, end) != (kept_start, kept_end):
+                continue
+            if end > kept_end:
+                kept_start, kept_end = start, end
+            found[canonical] = found.get(canonical, 0) + 1
+        return found
+
+
+_default_matcher = None
+
+
+def get_matcher():
+    """Return the matcher for the built-in lexicon, compiling it on first use."""
+    global _default_matcher
+    if _default_matcher is None:
+        _default_matcher = KeywordMatcher()
+    return _default_matcher
+
+
+def extract_skills(text):
+    """Return the canonical lexicon skills mentioned in text, in order of first occurrence."""
+    return list(get_matcher().find(text))
+
+
+def missing_keywords(resume_text, job_description=None, jd_skills=None):
+    """Return JD skills absent from the resume, in JD order.
+
+    Pass precomputed `jd_skills` (for example from a stored JD record) to skip matching the JD.
+    """
+    if jd_skills is None:
+        jd_skills = extract_skills(job_description)
+    resume_skills = get_matcher().find(resume_text)
+    return [skill for skill in jd_skills if skill not in resume_skills]
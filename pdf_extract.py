@@ -0,0 +1,106 @@
+import hashlib
+import io
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import PyPDF2 as pdf
+from cache import CACHE_DIR, TieredCache
+
+# Documents with at least this many pages are split across the process pool
+PARALLEL_PAGE_THRESHOLD = 12
+PAGES_PER_CHUNK = 4
+
+page_cache = TieredCache(
+    os.path.join(CACHE_DIR, "pdf_pages.sqlite3"),
+    max_memory_items=2048,
+    max_disk_items=200000,
+    ttl=None
+)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    """Return the shared extraction pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor()
+        return _pool
+
+
+def read_file_bytes(uploaded_file):
+    """Return the raw bytes of a path, bytes object or file-like upload."""
+    if isinstance(uploaded_file, (bytes, bytearray)):
+        return bytes(uploaded_file)
+    if isinstance(uploaded_file, str):
+        with open(uploaded_file, "rb") as f:
+            return f.read()
+    if hasattr(uploaded_file, "getvalue"):
+        return uploaded_file.getvalue()
+    uploaded_file.seek(0)
+    return uploaded_file.read()
+
+
+def _extract_page_range(data, start, stop):
+    """Extract text for pages [start, stop) of a PDF (runs in a worker process)."""
+    reader = pdf.PdfReader(io.BytesIO(data))
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def _page_key(file_hash, page_number):
+    return f"{file_hash}:{page_number}"
+
+
+def iter_pdf_pages(uploaded_file, max_pages=None, max_chars=None, workers=None):
+    """Yield the text of each PDF page in order, stopping early once a budget is reached.
+
+    Page text is cached by file hash, so re-uploading the same PDF is free. Large
+    documents are split into chunks and extracted across a process pool unless
+    `workers` is 1.
+    """
+    data = read_file_bytes(uploaded_file)
+    file_hash = hashlib.sha256(data).hexdigest()
+    reader = pdf.PdfReader(io.BytesIO(data))
+    page_count = len(reader.pages)
+    if page_count == 0:
+        raise Exception("PDF file is empty")
+
+    limit = min(page_count, max_pages) if max_pages else page_count
+    cached = [page_cache.get(_page_key(file_hash, i)) for i in range(limit)]
+    missing = [i for i, text in enumerate(cached) if text is None]
+
+    futures = {}
+    if len(missing) >= PARALLEL_PAGE_THRESHOLD and workers != 1:
+        pool = _get_pool()
+        for start in range(0, len(missing), PAGES_PER_CHUNK):
+            chunk = missing[start:start + PAGES_PER_CHUNK]
+            # Chunks are contiguous runs of uncached pages in the common (cold cache) case
+            future = pool.submit(_extract_page_range, data, chunk[0], chunk[-1] + 1)
+            for page_number in chunk:
+                futures[page_number] = (future, chunk[0])
+
+    chars = 0
+    try:
+        for page_number in range(limit):
+            text = cached[page_number]
+            if text is None:
+                if page_number in futures:
+                    future, chunk_start = futures[page_number]
+                    text = future.result()[page_number - chunk_start]
+                else:
+                    text = reader.pages[page_number].extract_text() or ""
+                page_cache.set(_page_key(file_hash, page_number), text)
+
+            if max_chars is not None and chars + len(text) > max_chars:
+                remaining = max_chars - chars
+                if remaining > 0:
+                    yield text[:remaining]
+                return
+            chars += len(text)
+            yield text
+    finally:
+        # Pages past the budget are no longer needed
+        for future, _ in futures.values():
+            future.cancel()
@@ -0,0 +1,111 @@
+import re
+from collections import Counter
+import numpy as np
+from scipy import sparse
+
+# Keeps tokens such as "c++", "c#", "node.js" and "ci/cd" intact
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#./\-]*[a-z0-9+#]|[a-z0-9]")
+
+STOPWORDS = frozenset("""
+a about above after again all also am an and any are as at be because been before being
+below between both but by can could did do does doing down during each etc few for from
+further had has have having he her here hers him his how i if in into is it its itself
+just me more most my no nor not now of off on once only or other our ours out over own
+per same she should so some such than that the their theirs them then there these they
+this those through to too under until up very via was we were what when where which while
+who whom why will with within would you your yours
+able ability across candidate candidates company experience including job looking must
+plus preferred required requirements role strong team work working years year
+""".split())
+
+
+def tokenize(text):
+    """Lowercase text and split it into terms, dropping stopwords and bare numbers."""
+    return [
+        token for token in TOKEN_PATTERN.findall((text or "").lower())
+        if token not in STOPWORDS and not token.isdigit()
+    ]
+
+
+def score_resumes(job_description, resume_texts, k1=1.2, b=0.75, max_missing=20, jd_term_counts=None):
+    """Score resumes against a job description locally with BM25.
+
+    The JD's terms act as the query. Each resume gets a 0-100 "score" (the idf-weighted
+    share of JD terms it covers, discounted by BM25 length normalization), a "coverage"
+    fraction of JD terms present, and the matched/missing JD terms ordered by weight.
+    Pass `jd_term_counts` (for example from a stored JD record) to skip tokenizing the JD.
+    """
+    if not resume_texts:
+        return []
+
+    if jd_term_counts is None:
+        jd_term_counts = Counter(tokenize(job_description))
+    if not jd_term_counts:
+        raise ValueError("Job description has no scorable terms")
+
+    terms = list(jd_term_counts)
+    vocabulary = {term: i for i, term in enumerate(terms)}
+    query_counts = [jd_term_counts[term] for term in terms]
+
+    # Sparse term-frequency matrix restricted to JD terms: one row per resume
+    data, indices, indptr, doc_lengths = [], [], [0], []
+    for text in resume_texts:
+        tokens = tokenize(text)
+        doc_lengths.append(len(tokens))
+        counts = {}
+        for token in tokens:
+            column = vocabulary.get(token)
+            if column is not None:
+                counts[column] = counts.get(column, 0) + 1
+        indices.extend(counts.keys())
+        data.extend(counts.values())
+        indptr.append(len(indices))
+
+    n_docs = len(resume_texts)
+    tf = sparse.csr_matrix(
+        (np.asarray(data, dtype=np.float64), np.asarray(indices, dtype=np.int64), np.asarray(indptr)),
+        shape=(n_docs, len(terms))
+    )
+    doc_lengths = np.asarray(doc_lengths, dtype=np.float64)
+    avg_length = doc_lengths.mean() or 1.0
+
+    # BM25 idf over the resume corpus (always positive) weighted by JD term frequency.
+    # A single resume gives no basis for rarity, so its terms are weighted uniformly.
+    if n_docs > 1:
+        df = np.bincount(tf.indices, minlength=len(terms)).astype(np.float64)
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+    else:
+        idf = np.ones(len(terms))
+    weights = idf * (1.0 + np.log(np.asarray(query_counts, dtype=np.float64)))
+
+    # BM25 term saturation for every non-zero entry, scaled so that a single mention in an
+    # average-length resume counts fully, then capped at 1
+    rows = np.repeat(np.arange(n_docs), np.diff(tf.indptr))
+    length_norm = k1 * (1.0 - b + b * doc_lengths / avg_length)
+    saturated = tf.copy()
+    saturated.data = np.minimum(tf.data * (k1 + 1.0) / (tf.data + length_norm[rows]), 1.0)
+
+    scores = 100.0 * (saturated @ weights) / weights.sum()
+    coverage = np.asarray((tf > 0).sum(axis=1)).ravel() / len(terms)
+
+    order = np.argsort(-weights)
+    results = []
+    for i in range(n_docs):
+        present = set(tf.indices[tf.indptr[i]:tf.indptr[i + 1]].tolist())
+        results.append({
+            "score": round(float(scores[i]), 2),
+            "coverage": round(float(coverage[i]), 4),
+            "matched": [terms[j] for j in order if j in present],
+            "missing": [terms[j] for j in order if j not in present][:max_missing],
+        })
+    return results
+
+
+def select_candidates(scores, top_n=None, min_score=None):
+    """Return indexes of the resumes worth sending to the model, best local score first."""
+    ranked = sorted(range(len(scores)), key=lambda i: -scores[i]["score"])
+    if min_score is not None:
+        ranked = [i for i in ranked if scores[i]["score"] >= min_score]
+    if top_n is not None:
+        ranked = ranked[:top_n]
+    return ranked
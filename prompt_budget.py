@@ -0,0 +1,147 @@
+import math
+import re
+import threading
+from collections import Counter
+
+# Default per-section token budgets for the analysis prompt
+RESUME_TOKEN_BUDGET = 3000
+JD_TOKEN_BUDGET = 1500
+# Extracted resume text past this many characters cannot reach the prompt: about four
+# characters per token, with four times headroom for what compaction removes
+MAX_RESUME_CHARS = RESUME_TOKEN_BUDGET * 4 * 4
+# Budget for one resume section in a section-by-section re-analysis
+SECTION_TOKEN_BUDGET = 800
+# Lines this close to the top or bottom of a page may be running headers or footers
+PAGE_EDGE_LINES = 2
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+# Whole lines that carry no information for the analysis
+BOILERPLATE_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in [
+    r"^page \d+( of \d+)?$",
+    r"^-?\s*\d{1,3}\s*(/\s*\d{1,3})?\s*-?$",
+    r"^(curriculum vitae|resume|résumé|cv)$",
+    r"^references (are )?available (up)?on request\.?$",
+    r"^(private and )?confidential$",
+    r"^[\W_]+$",
+    r"equal (employment )?opportunity employer",
+    r"^(apply now|click here to apply|share this job)\.?$",
+]]
+
+
+def estimate_tokens(text):
+    """Estimate the model token count of text without calling the API.
+
+    Words count as one token per four characters (at least one) and every
+    punctuation mark as one token, which tracks subword tokenizers closely
+    enough for budgeting.
+    """
+    return sum(
+        math.ceil(len(token) / 4) if token[0].isalnum() or token[0] == "_" else 1
+        for token in _TOKEN_PATTERN.findall(text or "")
+    )
+
+
+def _page_edge_lines(pages):
+    """Return the lines that recur at the top or bottom of more than one page."""
+    counts = Counter()
+    for page in pages:
+        lines = [key for key in (" ".join(line.split()).lower() for line in page.splitlines()) if key]
+        counts.update(set(lines[:PAGE_EDGE_LINES] + lines[-PAGE_EDGE_LINES:]))
+    return {line for line, count in counts.items() if count > 1}
+
+
+def compact_text(text):
+    """Collapse whitespace, drop boilerplate lines and remove repeated page headers and footers.
+
+    Pages are separated by form feeds (as in extracted PDF text). A line that recurs at
+    the edge of several pages is kept only the first time; other lines are dropped only
+    when they repeat the line right before them, so repeated roles or bullets survive.
+    """
+    pages = (text or "").split("\f")
+    page_edges = _page_edge_lines(pages) if len(pages) > 1 else set()
+    seen_edges = set()
+    lines = []
+    previous = None
+    for page in pages:
+        for line in page.splitlines():
+            line = " ".join(line.split())
+            if not line or any(pattern.search(line) for pattern in BOILERPLATE_PATTERNS):
+                continue
+            key = line.lower()
+            if key == previous or key in seen_edges:
+                continue
+            if key in page_edges:
+                seen_edges.add(key)
+            previous = key
+            lines.append(line)
+    return "\n".join(lines)
+
+
+def truncate_to_budget(text, max_tokens):
+    """Keep whole lines (and then words) from the start of text until max_tokens is reached."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    kept = []
+    used = 0
+    for line in text.splitlines():
+        line_tokens = estimate_tokens(line)
+        if used + line_tokens <= max_tokens:
+            kept.append(line)
+            used += line_tokens
+            continue
+        words = []
+        for word in line.split():
+            word_tokens = estimate_tokens(word)
+            if used + word_tokens > max_tokens:
+                break
+            words.append(word)
+            used += word_tokens
+        if words:
+            kept.append(" ".join(words))
+        break
+    return "\n".join(kept)
+
+
+def compact_section(text, max_tokens):
+    """Compact one prompt section and enforce its token budget."""
+    return truncate_to_budget(compact_text(text), max_tokens)
+
+
+class BudgetStats:
+    """Running totals of estimated prompt tokens before and after compaction."""
+
+    def __init__(self):
+        self.prompts = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+        self._lock = threading.Lock()
+
+    def record(self, tokens_before, tokens_after):
+        with self._lock:
+            self.prompts += 1
+            self.tokens_before += tokens_before
+            self.tokens_after += tokens_after
+
+    @property
+    def tokens_saved(self):
+        return self.tokens_before - self.tokens_after
+
+
+budget_stats = BudgetStats()
+
+
+def compact_prompt_sections(resume_text, job_description,
+                            resume_budget=RESUME_TOKEN_BUDGET, jd_budget=JD_TOKEN_BUDGET):
+    """Compact the resume and job description for a prompt and record the tokens saved in budget_stats.
+
+    Returns (resume_text, job_description).
+    """
+    compacted_resume = compact_section(resume_text, resume_budget)
+    compacted_jd = compact_section(job_description, jd_budget)
+    budget_stats.record(
+        estimate_tokens(resume_text) + estimate_tokens(job_description),
+        estimate_tokens(compacted_resume) + estimate_tokens(compacted_jd)
+    )
+    return compacted_resume, compacted_jd
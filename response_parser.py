@@ -0,0 +1,303 @@
+import json
+import re
+from dataclasses import dataclass, field
+
+_CODE_FENCE = re.compile(r"```[a-zA-Z]*")
+_CLOSERS = {"{": "}", "[": "]"}
+_CONTROL_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}
+
+
+class ResponseParseError(Exception):
+    """Raised when model output cannot be turned into a valid analysis."""
+
+
+def strip_code_fences(text):
+    """Remove Markdown code fences such as ```json around model output."""
+    return _CODE_FENCE.sub("", text or "")
+
+
+def extract_json_object(text):
+    """Return the first top-level JSON object in text, found in a single string-aware pass.
+
+    If the object is never closed (for example a truncated response), the text from the
+    opening brace to the end is returned so repair_json can close it.
+    """
+    start = text.find("{")
+    if start == -1:
+        return None
+
+    depth = 0
+    in_string = False
+    escape = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return text[start:]
+
+
+def repair_json(text):
+    """Repair common model JSON mistakes in a single pass.
+
+    Drops trailing and doubled commas, escapes raw control characters inside strings,
+    and closes a string or containers left open at the end of truncated output.
+    """
+    out = []
+    stack = []
+    in_string = False
+    escape = False
+    pending_comma = False
+
+    for ch in text:
+        if in_string:
+            if escape:
+                escape = False
+                out.append(ch)
+            elif ch == "\\":
+                escape = True
+                out.append(ch)
+            elif ch == '"':
+                in_string = False
+                out.append(ch)
+            elif ch < " ":
+                out.append(_CONTROL_ESCAPES.get(ch, "\\u%04x" % ord(ch)))
+            else:
+                out.append(ch)
+            continue
+
+        if ch.isspace():
+            continue
+        if ch == ",":
+            # Only emit the comma once we know another value follows it
+            pending_comma = True
+            continue
+        if pending_comma:
+            pending_comma = False
+            if ch not in "}]":
+                out.append(",")
+
+        if ch == '"':
+            in_string = True
+        elif ch in _CLOSERS:
+            stack.append(_CLOSERS[ch])
+        elif ch in "}]":
+            if stack and stack[-1] == ch:
+                stack.pop()
+            else:
+                # Unbalanced closer; skip it rather than corrupt the structure
+                continue
+        out.append(ch)
+
+    if in_string:
+        if escape:
+            out.pop()
+        out.append('"')
+    if out and out[-1] == ":":
+        out.append("null")
+    out.extend(reversed(stack))
+    return "".join(out)
+
+
+def loads_lenient(text):
+    """Parse a JSON value, repairing trailing commas, raw control characters and truncation."""
+    try:
+        return json.loads(text, strict=False)
+    except json.JSONDecodeError:
+        return json.loads(repair_json(text), strict=False)
+
+
+def parse_percentage(value):
+    """Convert a "JD Match" value such as 85, "85" or "85%" to a number, or None."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    match = re.search(r"\d+(?:\.\d+)?", str(value or ""))
+    if not match:
+        return None
+    number = float(match.group())
+    return int(number) if number.is_integer() else number
+
+
+def _as_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return "\n".join(str(item) for item in value)
+    return str(value)
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [item.strip() for item in value.split(",") if item.strip()]
+    if isinstance(value, list):
+        return [_as_text(item) for item in value if item not in (None, "")]
+    return [_as_text(value)]
+
+
+@dataclass
+class AnalysisResult:
+    """Typed view of an analysis response."""
+
+    jd_match: float = None
+    missing_keywords: list = field(default_factory=list)
+    profile_summary: str = ""
+    improvements: dict = field(default_factory=dict)
+    cold_message: str = ""
+    extra: dict = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, data):
+        improvements = data.get("Improvements") or {}
+        if not isinstance(improvements, dict):
+            improvements = {"Skills": improvements}
+        known = {"JD Match", "MissingKeywords", "Profile Summary", "Improvements", "Cold Message"}
+        return cls(
+            jd_match=parse_percentage(data.get("JD Match")),
+            missing_keywords=_as_list(data.get("MissingKeywords")),
+            profile_summary=_as_text(data.get("Profile Summary")),
+            improvements={str(key): _as_list(items) for key, items in improvements.items()},
+            cold_message=_as_text(data.get("Cold Message")),
+            extra={key: value for key, value in data.items() if key not in known},
+        )
+
+    def to_dict(self):
+        """Return the response in the original JSON field names."""
+        return {
+            "JD Match": None if self.jd_match is None else f"{self.jd_match}%",
+            "MissingKeywords": self.missing_keywords,
+            "Profile Summary": self.profile_summary,
+            "Improvements": self.improvements,
+            "Cold Message": self.cold_message,
+            **self.extra,
+        }
+
+
+def parse_analysis(text, required_fields=()):
+    """Parse raw model output into an AnalysisResult.
+
+    Code fences and surrounding prose are ignored, near-valid JSON is repaired, and
+    every field in required_fields must be present. Raises ResponseParseError otherwise.
+    """
+    candidate = extract_json_object(strip_code_fences(text))
+    if candidate is None:
+        raise ResponseParseError("Could not extract valid JSON response")
+
+    try:
+        data = loads_lenient(candidate)
+    except json.JSONDecodeError as e:
+        raise ResponseParseError(f"Could not extract valid JSON response: {e}")
+    if not isinstance(data, dict):
+        raise ResponseParseError("Response is not a JSON object")
+
+    for required_field in required_fields:
+        if required_field not in data:
+            raise ResponseParseError(f"Missing required field: {required_field}")
+
+    return AnalysisResult.from_dict(data)
+
+
+class IncrementalJSONParser:
+    """Parse a JSON object as it streams in, reporting each top-level field once it completes.
+
+    Text before the opening brace (such as a ```json code fence) is ignored.
+    """
+
+    def __init__(self):
+        self.fields = {}
+        self.done = False
+        self._state = "start"
+        self._buffer = []
+        self._key = None
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk):
+        """Consume the next chunk of text and return (field, value) pairs completed by it."""
+        completed = []
+        for ch in chunk:
+            if self._state == "start":
+                if ch == "{":
+                    self._state = "key"
+
+            elif self._state == "key":
+                if ch == '"':
+                    self._state = "key_string"
+                    self._buffer = []
+                    self._escape = False
+                elif ch == "}":
+                    self._state = "done"
+
+            elif self._state == "key_string":
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._key = json.loads('"' + "".join(self._buffer) + '"', strict=False)
+                    self._state = "colon"
+                    continue
+                self._buffer.append(ch)
+
+            elif self._state == "colon":
+                if ch == ":":
+                    self._state = "value"
+                    self._buffer = []
+                    self._depth = 0
+                    self._in_string = False
+                    self._escape = False
+
+            elif self._state == "value":
+                if self._in_string:
+                    if self._escape:
+                        self._escape = False
+                    elif ch == "\\":
+                        self._escape = True
+                    elif ch == '"':
+                        self._in_string = False
+                elif ch == '"':
+                    self._in_string = True
+                elif ch in "{[":
+                    self._depth += 1
+                elif ch in "}]":
+                    if self._depth == 0:
+                        self._finish_value(completed)
+                        self._state = "done"
+                        continue
+                    self._depth -= 1
+                elif ch == "," and self._depth == 0:
+                    self._finish_value(completed)
+                    self._state = "key"
+                    continue
+                self._buffer.append(ch)
+
+        self.done = self._state == "done"
+        return completed
+
+    def _finish_value(self, completed):
+        text = "".join(self._buffer).strip()
+        if not text:
+            return
+        try:
+            value = loads_lenient(text)
+        except json.JSONDecodeError:
+            # Leave malformed fields to the full parse once the response is complete
+            return
+        self.fields[self._key] = value
+        completed.append((self._key, value))
@@ -1,100 +1,289 @@
-import telebot
-from docx import Document
-from docx2pdf import convert
+import asyncio
+import io
 import os
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from telegram import Update
+from telegram.ext import Application, CommandHandler, ContextTypes, MessageHandler, filters
+
+# Share the conversion backends with the main app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cache import CACHE_DIR, TieredCache, make_cache_key
+from converters import get_converter
+from resume_store import MAX_RESUME_BYTES, ResumeTemplate, UserError, UserResumeStore
 
 load_dotenv()
 
-BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")  
-bot = telebot.TeleBot(BOT_TOKEN)
+BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+# Resume used for people who have not uploaded their own (optional)
+RESUME_PATH = os.getenv(
+    "RESUME_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "Amal_Asati__Resume.docx")
+)
+# Documents edited and converted at the same time
+WORKERS = int(os.getenv("BOT_WORKERS", "4"))
+# Requests waiting across all chats, and per chat, before new ones are turned away
+MAX_PENDING = int(os.getenv("BOT_MAX_PENDING", "100"))
+MAX_PENDING_PER_CHAT = int(os.getenv("BOT_MAX_PENDING_PER_CHAT", "3"))
+
+
+def parse_skills(text):
+    """Split a message into skills, dropping blanks and case-insensitive repeats."""
+    skills = []
+    seen = set()
+    for skill in text.strip().split(','):
+        skill = skill.strip()
+        if skill and skill.lower() not in seen:
+            seen.add(skill.lower())
+            skills.append(skill)
+    return skills
+
+
+def convert_to_pdf(docx_bytes):
+    """Convert DOCX bytes to PDF bytes (blocking; may start the conversion backend on first use)."""
+    return get_converter().convert(docx_bytes)
+
+
+class ChatJobQueue:
+    """Bounded job queue run by a pool of worker tasks, serialized per chat.
+
+    Each chat has its own FIFO of pending jobs and at most one job running, so a
+    user's requests are applied in order while different chats proceed in parallel.
+    A chat is in the ready queue at most once, which keeps workers from blocking on
+    a busy chat and shares them fairly between chats.
+    """
+
+    def __init__(self, workers=WORKERS, max_pending=MAX_PENDING, max_pending_per_chat=MAX_PENDING_PER_CHAT):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_pending_per_chat = max_pending_per_chat
+        self.pending = 0
+        self._jobs = {}
+        self._ready = asyncio.Queue()
+        self._tasks = []
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def is_full(self, chat_id):
+        """Return True if a new job for chat_id would be turned away."""
+        chat_jobs = self._jobs.get(chat_id)
+        return self.pending >= self.max_pending or bool(chat_jobs and len(chat_jobs) >= self.max_pending_per_chat)
+
+    def submit(self, chat_id, job):
+        """Queue a coroutine function for a chat; return its position, or None when the queue is full."""
+        if self.is_full(chat_id):
+            return None
+        chat_jobs = self._jobs.get(chat_id)
+
+        self.pending += 1
+        if chat_jobs is None:
+            # The chat was idle, so it becomes ready for a worker
+            chat_jobs = self._jobs[chat_id] = deque()
+            self._ready.put_nowait(chat_id)
+        chat_jobs.append(job)
+        return self.pending
+
+    async def _worker(self):
+        while True:
+            chat_id = await self._ready.get()
+            chat_jobs = self._jobs[chat_id]
+            job = chat_jobs.popleft()
+            try:
+                await job()
+            except Exception as e:
+                print(f"Job for chat {chat_id} failed: {e}")
+            finally:
+                self.pending -= 1
+                # Hand the chat back to the pool only after its current job finished
+                if chat_jobs:
+                    self._ready.put_nowait(chat_id)
+                else:
+                    del self._jobs[chat_id]
+
+
+executor = ThreadPoolExecutor(max_workers=WORKERS)
+jobs = ChatJobQueue()
+template = ResumeTemplate(RESUME_PATH)
+resumes = UserResumeStore()
+# Rendered PDFs by owner, template version and skill list, so repeat requests skip editing and conversion
+pdf_cache = TieredCache(os.path.join(CACHE_DIR, "bot_pdfs.sqlite3"), max_memory_items=64, max_disk_items=1000)
+DEFAULT_RESUME_PREFIX = "default:"
+
+
+async def run_blocking(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+
+
+def user_cache_prefix(user_id):
+    """Return the PDF cache key prefix of a user's own resume, so /delete can purge their PDFs."""
+    return f"user-{user_id}:"
+
+
+def resume_for(user_id):
+    """Return the user's parsed resume and its PDF cache key prefix, falling back to the default one (blocking)."""
+    loaded = resumes.get(user_id)
+    if loaded is not None:
+        return loaded, user_cache_prefix(user_id)
+    if os.path.exists(RESUME_PATH):
+        return template.current(), DEFAULT_RESUME_PREFIX
+    return None, None
+
+
+def pdf_cache_key(prefix, loaded, skills):
+    """Return the PDF cache key for a resume and the exact skill list `render` writes into it.
+
+    The PDF shows the skills in the order and case they were typed, so a differently
+    ordered or cased request must not be served another request's PDF.
+    """
+    return prefix + make_cache_key(loaded.digest, *skills)
+
+
+def forget_user(user_id):
+    """Delete a user's stored resume and the PDFs rendered from it (blocking)."""
+    resumes.delete(user_id)
+    pdf_cache.delete_prefix(user_cache_prefix(user_id))
+
+
+async def enqueue(message, job):
+    """Queue a job for the message's chat and return its status message (None when turned away)."""
+    busy_text = "⏳ I'm busy with other requests right now. Please try again in a minute."
+    if jobs.is_full(message.chat_id):
+        await message.reply_text(busy_text)
+        return None
+    # Send the status message first so the job always has a message to update
+    status = await message.reply_text(f"⏳ Queued (position {jobs.pending + 1})...")
+    if jobs.submit(message.chat_id, lambda: job(status)) is None:
+        await status.edit_text(busy_text)
+        return None
+    return status
 
-@bot.message_handler(commands=['start'])
-def send_welcome(message):
-    bot.reply_to(message, "Hi! Send me a skill to add to your resume (e.g., AWS, Azure, Docker).")
 
-@bot.message_handler(func=lambda msg: True)
-def handle_skill(message):
-    skills = message.text.strip().split(',')
-    skills = [skill.strip() for skill in skills if skill.strip()]
-    
+async def send_welcome(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await update.message.reply_text(
+        "Hi! Send me your resume as a .docx file, then send a skill to add to it (e.g., AWS, Azure, Docker). "
+        "Use /delete to remove your stored resume."
+    )
+
+
+async def handle_resume_upload(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    message = update.message
+    document = message.document
+    if document.file_size and document.file_size > MAX_RESUME_BYTES:
+        await message.reply_text(f"Resumes must be smaller than {MAX_RESUME_BYTES // (1024 * 1024)} MB.")
+        return
+
+    async def job(status):
+        try:
+            await status.edit_text("📥 Reading your resume...")
+            telegram_file = await document.get_file()
+            data = bytes(await telegram_file.download_as_bytearray())
+            await run_blocking(resumes.put, message.from_user.id, document.file_name or "resume.docx", data)
+            await status.edit_text("✅ Resume saved. Now send me the skills to add, separated by commas.")
+
+        except UserError as e:
+            await status.edit_text(str(e))
+        except Exception as e:
+            await status.edit_text(f"❌ An error occurred: {e}")
+
+    await enqueue(message, job)
+
+
+async def delete_resume(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    message = update.message
+    user_id = message.from_user.id
+
+    # Queued like other requests, so it runs after (not during) the chat's pending jobs
+    async def job(status):
+        try:
+            await run_blocking(forget_user, user_id)
+            await status.edit_text("🗑️ Your stored resume was deleted.")
+        except Exception as e:
+            await status.edit_text(f"❌ An error occurred: {e}")
+
+    await enqueue(message, job)
+
+
+async def handle_skill(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    message = update.message
+    skills = parse_skills(message.text)
+
     if not skills:
-        bot.reply_to(message, "Please provide at least one skill.")
+        await message.reply_text("Please provide at least one skill.")
         return
-    
-    try:
-        resume_path = r"telegram_resume_bot\Amal_Asati__Resume.docx"
-        doc = Document(resume_path)
-        
-        # Find the Skills section
-        skills_para = None
-        skills_index = -1
-        
-        for i, para in enumerate(doc.paragraphs):
-            if "SKILLS" in para.text:
-                skills_para = para
-                skills_index = i
-                break
-        
-        if skills_para is None:
-            bot.reply_to(message, "Could not find the 'SKILLS' section.")
-            return
-        
-        # Get formatting from a template paragraph
-        template_para = None
-        for i in range(skills_index + 1, len(doc.paragraphs)):
-            if "•" in doc.paragraphs[i].text or "|" in doc.paragraphs[i].text:
-                template_para = doc.paragraphs[i]
-                break
-        
-        # Find the target bullet point to append to
-        target_para = None
-        for para in doc.paragraphs[skills_index + 1:]:
-            if "MySQL | PowerBI | MS-Excel" in para.text:
-                target_para = para
-                break
-
-        if not target_para:
-            bot.reply_to(message, "Could not find the target skills line to update.")
-            return
-
-        # Append skills to the existing text
-        existing_text = target_para.text.strip()
-        if not existing_text.endswith('|'):
-            existing_text += ' | '
-        existing_text += ' | '.join(skills)
-
-        # Clear and update paragraph
-        target_para.clear()
-        run = target_para.add_run(existing_text)
-
-        if template_para and template_para.runs:
-            run.font.size = template_para.runs[0].font.size
-            run.font.name = template_para.runs[0].font.name
-            run.font.bold = template_para.runs[0].font.bold
-            run.font.italic = template_para.runs[0].font.italic
-        if template_para:
-            target_para.paragraph_format.left_indent = template_para.paragraph_format.left_indent
-            target_para.paragraph_format.line_spacing = template_para.paragraph_format.line_spacing
-            target_para.paragraph_format.space_after = template_para.paragraph_format.space_after
-            target_para.paragraph_format.space_before = template_para.paragraph_format.space_before
-        
-        # Save and convert
-        updated_docx = "updated_resume.docx"
-        updated_pdf = "updated_resume.pdf"
-        doc.save(updated_docx)
-        convert(updated_docx, updated_pdf)
-        
-        with open(updated_pdf, "rb") as f:
-            bot.send_document(message.chat.id, f)
-
-        os.remove(updated_docx)
-        os.remove(updated_pdf)
-        
-        bot.reply_to(message, f"✅ Successfully added: {', '.join(skills)}")
-
-    except Exception as e:
-        bot.reply_to(message, f"❌ An error occurred: {e}")
-
-print("Bot is running...")
-bot.infinity_polling()
+
+    user_id = message.from_user.id
+
+    async def job(status):
+        try:
+            loaded, cache_prefix = await run_blocking(resume_for, user_id)
+            if loaded is None:
+                await status.edit_text("Please send me your resume as a .docx file first.")
+                return
+            cache_key = pdf_cache_key(cache_prefix, loaded, skills)
+            pdf_bytes = await run_blocking(pdf_cache.get, cache_key)
+
+            if pdf_bytes is None:
+                await status.edit_text("⚙️ Updating your resume...")
+                docx_bytes = await run_blocking(loaded.render, skills)
+
+                # Convert in memory (headless LibreOffice pool on Linux, Word on Windows)
+                await status.edit_text("📄 Converting to PDF...")
+                pdf_bytes = await run_blocking(convert_to_pdf, docx_bytes)
+                await run_blocking(pdf_cache.set, cache_key, pdf_bytes)
+
+            pdf_file = io.BytesIO(pdf_bytes)
+            pdf_file.name = "updated_resume.pdf"
+            await message.reply_document(pdf_file)
+            await status.edit_text(f"✅ Successfully added: {', '.join(skills)}")
+
+        except UserError as e:
+            await status.edit_text(str(e))
+        except Exception as e:
+            await status.edit_text(f"❌ An error occurred: {e}")
+
+    await enqueue(message, job)
+
+
+async def start_jobs(application):
+    # Parse and index the default resume before the first request arrives
+    if os.path.exists(RESUME_PATH):
+        try:
+            await run_blocking(template.current)
+        except Exception as e:
+            print(f"Could not load the default resume: {e}")
+    jobs.start()
+
+
+async def stop_jobs(application):
+    await jobs.stop()
+    executor.shutdown(wait=False)
+
+
+def main():
+    application = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .concurrent_updates(True)
+        .post_init(start_jobs)
+        .post_shutdown(stop_jobs)
+        .build()
+    )
+    application.add_handler(CommandHandler("start", send_welcome))
+    application.add_handler(CommandHandler("delete", delete_resume))
+    application.add_handler(MessageHandler(filters.Document.FileExtension("docx"), handle_resume_upload))
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_skill))
+
+    print("Bot is running...")
+    application.run_polling()
+
+
+if __name__ == "__main__":
+    main()
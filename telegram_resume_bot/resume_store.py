@@ -0,0 +1,205 @@
+import copy
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from docx import Document
+from docx.oxml.ns import qn
+from docx.text.paragraph import Paragraph
+from cache import CACHE_DIR
+from docx_sections import SectionIndex
+
+# Parsed resumes kept in memory; the rest are re-parsed from the store on demand
+MAX_PARSED_RESUMES = int(os.getenv("BOT_MAX_PARSED_RESUMES", "256"))
+MAX_RESUME_BYTES = 5 * 1024 * 1024
+
+
+class UserError(Exception):
+    """A problem with the request or the resume that is reported to the user as is."""
+
+
+def index_resume(doc):
+    """Locate the skills line of a resume and return its position in the document body.
+
+    The skills line is the last line of the Skills section that lists items with "|"
+    or "," (or else its last non-empty line). The first bulleted or piped line of the
+    section provides the formatting for edited lines.
+    """
+    section = SectionIndex(doc).get("Skills")
+    if section is None:
+        raise UserError("Could not find a Skills section in your resume. Add a heading such as 'SKILLS'.")
+
+    body = doc.element.body
+    lines = []
+    element = section["heading"]
+    while element is not section["last"]:
+        element = element.getnext()
+        if element.tag == qn("w:p"):
+            text = Paragraph(element, doc._body).text.strip()
+            if text:
+                lines.append((element, text))
+    if not lines:
+        raise UserError("The Skills section of your resume is empty.")
+
+    target, target_text = next(
+        ((element, text) for element, text in reversed(lines) if "|" in text or "," in text), lines[-1]
+    )
+    format_element = next((element for element, text in lines if "•" in text or "|" in text), None)
+    return {
+        "target_position": body.index(target),
+        "format_position": body.index(format_element) if format_element is not None else None,
+        "separator": " | " if "|" in target_text or "," not in target_text else ", ",
+    }
+
+
+class LoadedTemplate:
+    """One parsed resume with its skills line located."""
+
+    def __init__(self, data, index=None):
+        self.digest = hashlib.sha256(data).hexdigest()
+        self.doc = Document(io.BytesIO(data))
+        # A stored index skips the section scan; positions are only valid for the same bytes
+        self.index = index or index_resume(self.doc)
+
+    def render(self, skills):
+        """Return DOCX bytes of a copy of the resume with skills appended to the skills line."""
+        doc = copy.deepcopy(self.doc)
+        target_para = Paragraph(doc.element.body[self.index["target_position"]], doc._body)
+        template_para = None
+        if self.index["format_position"] is not None:
+            template_para = Paragraph(self.doc.element.body[self.index["format_position"]], self.doc._body)
+
+        # Append skills to the existing text
+        separator = self.index["separator"]
+        existing_text = target_para.text.strip()
+        if not existing_text.endswith(separator.strip()):
+            existing_text += separator
+        existing_text += separator.join(skills)
+
+        # Clear and update paragraph
+        target_para.clear()
+        run = target_para.add_run(existing_text)
+
+        if template_para and template_para.runs:
+            run.font.size = template_para.runs[0].font.size
+            run.font.name = template_para.runs[0].font.name
+            run.font.bold = template_para.runs[0].font.bold
+            run.font.italic = template_para.runs[0].font.italic
+        if template_para:
+            target_para.paragraph_format.left_indent = template_para.paragraph_format.left_indent
+            target_para.paragraph_format.line_spacing = template_para.paragraph_format.line_spacing
+            target_para.paragraph_format.space_after = template_para.paragraph_format.space_after
+            target_para.paragraph_format.space_before = template_para.paragraph_format.space_before
+
+        docx_buffer = io.BytesIO()
+        doc.save(docx_buffer)
+        return docx_buffer.getvalue()
+
+
+class ResumeTemplate:
+    """Resume file parsed and indexed once, and reloaded only when it changes on disk."""
+
+    def __init__(self, path):
+        self.path = path
+        self._loaded = None
+        self._stamp = None
+        self._lock = threading.Lock()
+
+    def current(self):
+        """Return the LoadedTemplate for the file's current contents (blocking)."""
+        stat = os.stat(self.path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if stamp != self._stamp:
+                with open(self.path, "rb") as f:
+                    self._loaded = LoadedTemplate(f.read())
+                self._stamp = stamp
+            return self._loaded
+
+
+class UserResumeStore:
+    """Per-user resumes in SQLite (bytes plus section index) with an LRU of parsed documents.
+
+    Uploads are indexed once. A user whose parsed document was evicted is re-parsed
+    from the stored bytes with the stored index, so the section scan never repeats.
+    """
+
+    def __init__(self, path=os.path.join(CACHE_DIR, "bot_resumes.sqlite3"), max_parsed=MAX_PARSED_RESUMES):
+        self.path = path
+        self.max_parsed = max_parsed
+        self._parsed = OrderedDict()
+        # Bumped by every put and delete, so a parse that raced one of them is not cached
+        self._generation = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS resumes ("
+            "user_id INTEGER PRIMARY KEY, filename TEXT NOT NULL, digest TEXT NOT NULL, "
+            "data BLOB NOT NULL, section_index TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def put(self, user_id, filename, data):
+        """Index and store a user's resume, replacing any previous one (blocking)."""
+        if len(data) > MAX_RESUME_BYTES:
+            raise UserError(f"Resumes must be smaller than {MAX_RESUME_BYTES // (1024 * 1024)} MB.")
+        try:
+            loaded = LoadedTemplate(data)
+        except UserError:
+            raise
+        except Exception as e:
+            raise UserError(f"Could not read your resume as a Word document: {e}")
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO resumes (user_id, filename, digest, data, section_index, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (user_id, filename, loaded.digest, data, json.dumps(loaded.index), time.time()),
+            )
+            self._conn.commit()
+            self._generation += 1
+            self._remember(user_id, loaded)
+        return loaded
+
+    def get(self, user_id):
+        """Return the user's parsed resume, or None if they have not uploaded one (blocking)."""
+        with self._lock:
+            loaded = self._parsed.get(user_id)
+            if loaded is not None:
+                self._parsed.move_to_end(user_id)
+                return loaded
+            row = self._conn.execute(
+                "SELECT data, section_index FROM resumes WHERE user_id = ?", (user_id,)
+            ).fetchone()
+            generation = self._generation
+        if row is None:
+            return None
+
+        # Parse outside the lock so other users are not held up
+        loaded = LoadedTemplate(row[0], index=json.loads(row[1]))
+        with self._lock:
+            # A put or delete while parsing may have replaced this row; don't bring it back
+            if self._generation == generation:
+                self._remember(user_id, loaded)
+        return loaded
+
+    def delete(self, user_id):
+        """Forget a user's resume."""
+        with self._lock:
+            self._parsed.pop(user_id, None)
+            self._conn.execute("DELETE FROM resumes WHERE user_id = ?", (user_id,))
+            self._conn.commit()
+            self._generation += 1
+
+    def _remember(self, user_id, loaded):
+        self._parsed[user_id] = loaded
+        self._parsed.move_to_end(user_id)
+        while len(self._parsed) > self.max_parsed:
+            self._parsed.popitem(last=False)
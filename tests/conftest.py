@@ -0,0 +1,7 @@
+import os
+import sys
+import tempfile
+
+# The modules live at the repository root; caches go to a scratch directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("RESUMEAI_CACHE_DIR", tempfile.mkdtemp(prefix="resumeai-tests-"))
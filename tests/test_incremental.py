@@ -0,0 +1,16 @@
+from incremental import make_base, reanalyze
+
+JD = "Need Go, C, AI and Docker experience"
+RESUME = "SUMMARY\nBackend engineer at Google\nSKILLS\nPython, MAIN services, Docker, k8s\n"
+
+
+def test_short_skills_are_not_found_inside_other_words():
+    base = make_base(RESUME, JD, {
+        "JD Match": "60%",
+        "Profile Summary": "Good",
+        "Improvements": {"Skills": ["Go", "C", "AI", "Docker", "Kubernetes"]},
+    })
+    # Nothing changed, so no section goes to the model and the analyzer is never used
+    analysis, stats = reanalyze(base, RESUME, JD, analyzer=None)
+    assert stats["changed_sections"] == []
+    assert analysis["Improvements"]["Skills"] == ["Go", "C", "AI"]
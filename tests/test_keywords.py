@@ -0,0 +1,35 @@
+from keywords import extract_skills, get_matcher, missing_keywords
+
+
+def test_ordinary_words_are_not_skills():
+    text = "We move at a swift pace; you will be at the helm of our hive of talent and spark new ideas."
+    assert extract_skills(text) == []
+
+
+def test_capitalized_names_match():
+    assert extract_skills("Swift, Helm, Hive and Spark") == ["Swift", "Helm", "Hive", "Apache Spark"]
+
+
+def test_r_matches_as_a_list_item():
+    assert extract_skills("Skills: Python, R, SQL") == ["Python", "R", "SQL"]
+    assert extract_skills("Python and R.") == ["Python", "R"]
+    assert extract_skills("Languages: R") == ["R"]
+
+
+def test_r_does_not_match_outside_lists():
+    assert extract_skills("R&D team") == []
+    assert extract_skills("Plan R was chosen") == []
+
+
+def test_matches_inside_longer_matches_are_dropped():
+    assert extract_skills("Experience with PL/SQL and T-SQL") == ["PL/SQL", "T-SQL"]
+    assert extract_skills("Microsoft SQL Server") == ["SQL Server"]
+    assert get_matcher().find("Apache Hive") == {"Hive": 1}
+
+
+def test_standalone_name_still_matches_next_to_longer_one():
+    assert extract_skills("SQL and PL/SQL") == ["SQL", "PL/SQL"]
+
+
+def test_missing_keywords_uses_aliases():
+    assert missing_keywords("Ran k8s clusters", "Need Kubernetes and Docker") == ["Docker"]